@@ -36,7 +36,7 @@ class AnimatedReelCreator:
         self.google_images = GoogleImageSearchFetcher()
         self.use_google_images = os.getenv('USE_GOOGLE_IMAGES', 'true').lower() == 'true'
         self.anchor_system = AnchorOverlaySystem()
-        self.buffer = CockroachBufferStorage()  # Initialize buffer storage
+        self.buffer = CockroachBufferStorage.get_default()  # Shared buffer storage connection
     
     def create_animated_reel(
         self,
@@ -118,20 +118,16 @@ class AnimatedReelCreator:
             # Step 3: Search for videos/photos on Pexels (additional clips after NYT image)
             all_media = []
             
-            # Try to get videos first from Pexels (use more keywords for variety)
-            for keyword in keywords[:4]:  # Increased from 2 to 4 keywords for more variety
-                videos = self.pexels.search_videos(keyword, per_page=3)  # More videos per keyword
+            # Try to get videos first from Pexels (4 keywords searched concurrently for variety)
+            for videos in self.pexels.search_videos_batch(keywords[:4], per_page=3):  # More videos per keyword
                 all_media.extend([{'type': 'video', 'data': v, 'source': 'pexels'} for v in videos])
-                if len(all_media) >= clips_count * 2:  # Get extra to have selection
-                    break
+            all_media = all_media[:clips_count * 2]  # Get extra to have selection
             
             # If not enough videos, supplement with photos from Pexels
             if len(all_media) < clips_count:
-                for keyword in keywords[:4]:  # Increased from 2 to 4
-                    photos = self.pexels.search_photos(keyword, per_page=3)  # More photos per keyword
+                for photos in self.pexels.search_photos_batch(keywords[:4], per_page=3):  # More photos per keyword
                     all_media.extend([{'type': 'photo', 'data': p, 'source': 'pexels'} for p in photos])
-                    if len(all_media) >= clips_count * 2:
-                        break
+                all_media = all_media[:clips_count * 2]
             
             # If still not enough and Google Image Search enabled, supplement with web images
             if len(all_media) < clips_count and self.use_google_images:
@@ -165,6 +161,13 @@ class AnimatedReelCreator:
             logger.info(f"⏱️  Individual clip duration: {clip_duration:.1f}s for dynamic transitions")
             logger.info(f"💾 Downloading clips to CockroachDB buffer...")
             
+            # Pexels clips download concurrently up front; IDs come back in all_media order
+            pexels_clip_ids = iter(self.pexels.download_media_batch(
+                [{'url': media['data']['url'], 'type': media['type']}
+                 for media in all_media if media['source'] == 'pexels'],
+                session_id
+            ))
+            
             for i, media in enumerate(all_media):
                 media_type = media['type']
                 media_data = media['data']
@@ -172,13 +175,19 @@ class AnimatedReelCreator:
                 
                 # Download media from appropriate source (returns buffer ID, not file path)
                 if media_source == 'pexels':
-                    clip_id = self.pexels.download_media(media_data['url'], media_type, session_id)
+                    clip_id = next(pexels_clip_ids)
                 elif media_source == 'google_images':
                     # Google images still return file paths for now
                     media_path = self.google_images.download_photo(media_data['url'])
                     if media_path:
-                        # Store in buffer
-                        clip_id = self.buffer.store_clip(media_path, 'photo', session_id)
+                        # Store in buffer; always drop the local copy, even if the insert fails
+                        try:
+                            clip_id = self.buffer.store_clip(media_path, 'photo', session_id)
+                        finally:
+                            try:
+                                os.unlink(media_path)
+                            except FileNotFoundError:
+                                pass
                     else:
                         clip_id = None
                 else:
@@ -188,6 +197,12 @@ class AnimatedReelCreator:
                     logger.warning(f"⚠️ Failed to download {media_type} {i+1}, skipping")
                     continue
                 
+                # A repeated URL comes back as the clip already buffered for this session;
+                # each clip is deleted right after use, so it must only be listed once
+                if any(clip_info['id'] == clip_id for clip_info in clip_ids):
+                    logger.info(f"♻️ {media_type.capitalize()} {i+1} duplicates an earlier clip, skipping")
+                    continue
+                
                 clip_ids.append({
                     'id': clip_id,
                     'type': media_type,
@@ -270,7 +285,7 @@ class AnimatedReelCreator:
                         logger.info(f"💾 Batch processing {len(clips)} clips to free memory...")
                         try:
                             # Concatenate current batch
-                            batch_concat = concatenate_videoclips(clips, method="compose")
+                            batch_concat = concatenate_videoclips(clips, method=self._concat_method(clips))
                             
                             # Write to temp file
                             temp_batch = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
@@ -298,9 +313,6 @@ class AnimatedReelCreator:
                             
                         except Exception as batch_error:
                             logger.warning(f"⚠️ Batch processing failed: {batch_error}")
-                    
-                    # Force garbage collection after each clip
-                    gc.collect()
             
             # Step 4: Prepend NYT image clip if available
             if nyt_clip:
@@ -316,7 +328,7 @@ class AnimatedReelCreator:
             # Step 5: Concatenate all clips (NYT image first, then stock footage)
             logger.info(f"🎬 Concatenating {len(clips)} clips...")
             logger.info(f"   Clip order: {'NYT image → ' if nyt_clip else ''}stock footage ({len(clips) - (1 if nyt_clip else 0)} clips)")
-            final_video = concatenate_videoclips(clips, method="compose", transition=None)
+            final_video = concatenate_videoclips(clips, method=self._concat_method(clips), transition=None)
             
             # Step 6: Add headline text overlay THROUGHOUT the entire video
             logger.info("📝 Adding headline text overlay throughout video...")
@@ -487,6 +499,16 @@ class AnimatedReelCreator:
         
         return clip
     
+    def _concat_method(self, clips):
+        """
+        'chain' when every clip has the same frame size (all go through _resize_to_portrait),
+        otherwise 'compose' so mismatched clips are still centered on a common canvas
+        """
+        if len({tuple(clip.size) for clip in clips}) == 1:
+            return 'chain'
+        logger.warning("⚠️ Clip sizes differ, using compose concatenation")
+        return 'compose'
+    
     def _add_ken_burns_effect(self, clip, duration):
         """Add zoom and pan effect to image clip (Ken Burns effect)"""
         try:
@@ -4,26 +4,148 @@ Stores temporary video clips in database during processing to avoid using Render
 """
 
 import os
+import mmap
+import hashlib
 import tempfile
 import logging
+import atexit
+import functools
+import threading
+import struct
+import uuid
+from io import BytesIO
 import psycopg2
 from typing import Optional
 from datetime import datetime, timedelta
 
+try:
+    from google.cloud import storage
+    HAS_GCS = True
+except ImportError:
+    HAS_GCS = False
+
 logger = logging.getLogger(__name__)
 
+# Largest source clip downloaded into the pipeline (Pexels fetcher and Cloud Run clip_urls)
+MAX_CLIP_BYTES = 10 * 1024 * 1024
+
+# With BUFFER_GCS_BUCKET set, clips larger than this are uploaded to that bucket
+# and temp_clips keeps only a pointer row (gcs_uri); chunked rows remain the fallback
+GCS_OFFLOAD_MIN_BYTES = 1024 * 1024
+
+# Chunk size for clips stored in temp_clip_chunks, overridable with BUFFER_CHUNK_SIZE_MB
+# (compare sizes with: python test_chunking.py --chunk-matrix). Each chunk is sent as one
+# COPY message, so it has to stay under CockroachDB's 16 MB message limit.
+DEFAULT_CHUNK_SIZE_MB = 6
+MAX_CHUNK_SIZE_MB = 15
+
+_gcs_client = None
+_gcs_client_lock = threading.Lock()
+
+def get_gcs_client():
+    """Shared Cloud Storage client, or None if google-cloud-storage is not installed"""
+    global _gcs_client
+    if not HAS_GCS:
+        return None
+    with _gcs_client_lock:
+        if _gcs_client is None:
+            _gcs_client = storage.Client()
+        return _gcs_client
+
+def download_gcs_clip(gcs_uri: str, file_path: str):
+    """Download an offloaded clip (gs://bucket/name) to file_path"""
+    client = get_gcs_client()
+    if client is None:
+        raise RuntimeError(f"google-cloud-storage not installed, cannot fetch {gcs_uri}")
+    storage.Blob.from_string(gcs_uri, client=client).download_to_filename(file_path, timeout=60)
+
+def _synchronized(method):
+    """Serialize DB work on the shared connection (one transaction per connection)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class ChunkCopyStream:
+    """
+    File-like reader producing PostgreSQL binary COPY data for a chunk table
+    laid out as (parent UUID, chunk_number INT, chunk_data BYTEA)
+    
+    Each read() returns the next piece of the stream (header, row prefix, chunk payload, trailer)
+    so chunks are sent one at a time, without hex escaping, in a single COPY statement.
+    """
+    
+    HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+    TRAILER = struct.pack('!h', -1)
+    
+    def __init__(self, parent_id, chunks):
+        self._pieces = self._iter_pieces(uuid.UUID(parent_id).bytes, chunks)
+    
+    @classmethod
+    def _iter_pieces(cls, parent_uuid, chunks):
+        yield cls.HEADER
+        for chunk_number, chunk in enumerate(chunks):
+            # 3 fields: parent UUID (16 bytes), chunk_number INT (INT8 on CockroachDB), chunk_data BYTEA
+            yield (struct.pack('!hi', 3, 16) + parent_uuid +
+                   struct.pack('!iq', 8, chunk_number) +
+                   struct.pack('!i', len(chunk)))
+            # copy_expert only accepts bytes from read()
+            yield chunk if isinstance(chunk, bytes) else bytes(chunk)
+            logger.info(f"   💾 Streamed chunk {chunk_number + 1}")
+        yield cls.TRAILER
+    
+    def read(self, size=-1):
+        return next(self._pieces, b'')
+
 class CockroachBufferStorage:
     """
     Temporary storage for video clips in CockroachDB
     Prevents large files from consuming Render's limited disk/memory
     """
     
+    _default = None
+    _default_lock = threading.Lock()
+    
     def __init__(self):
         """Initialize connection to CockroachDB"""
         self.conn = None
+        self._lock = threading.RLock()  # Instances may be shared across request threads
+        self.chunk_size = int(self._chunk_size_mb_from_env() * 1024 * 1024)
         self.connect()
         self.ensure_table_exists()
     
+    @staticmethod
+    def _chunk_size_mb_from_env() -> float:
+        """BUFFER_CHUNK_SIZE_MB clamped to 1..MAX_CHUNK_SIZE_MB (DEFAULT_CHUNK_SIZE_MB if unset or invalid)"""
+        value = os.getenv('BUFFER_CHUNK_SIZE_MB')
+        if not value:
+            return DEFAULT_CHUNK_SIZE_MB
+        try:
+            chunk_size_mb = float(value)
+        except ValueError:
+            chunk_size_mb = 0
+        if not chunk_size_mb > 0:  # Also catches nan
+            logger.warning(f"⚠️ Invalid BUFFER_CHUNK_SIZE_MB={value!r}, using {DEFAULT_CHUNK_SIZE_MB} MB")
+            return DEFAULT_CHUNK_SIZE_MB
+        return min(max(chunk_size_mb, 1), MAX_CHUNK_SIZE_MB)
+    
+    @classmethod
+    def get_default(cls) -> 'CockroachBufferStorage':
+        """
+        Process-wide shared buffer, so callers reuse one TLS connection (and run the
+        table DDL once) instead of opening their own. Closed automatically at exit.
+        """
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+                atexit.register(cls._default.close)
+            elif cls._default.conn.closed:
+                # Shared instance lost (or was handed back) its connection; reconnect
+                cls._default.connect()
+            return cls._default
+    
+    @_synchronized
     def connect(self):
         """Connect to CockroachDB"""
         try:
@@ -46,6 +168,7 @@ class CockroachBufferStorage:
             logger.error(f"❌ Failed to connect to CockroachDB: {e}")
             raise
     
+    @_synchronized
     def ensure_table_exists(self):
         """Create temp_clips table with chunking support if not exists"""
         try:
@@ -61,10 +184,24 @@ class CockroachBufferStorage:
                     created_at TIMESTAMP DEFAULT NOW(),
                     session_id VARCHAR(100),
                     is_chunked BOOLEAN DEFAULT FALSE,
-                    total_chunks INT DEFAULT 1
+                    total_chunks INT DEFAULT 1,
+                    source_url_hash BYTEA,
+                    sha256 BYTEA
                 )
             """)
             
+            # Source URL hash lets a session reuse a clip it already downloaded
+            # (column added here for tables created before it existed)
+            cursor.execute("ALTER TABLE temp_clips ADD COLUMN IF NOT EXISTS source_url_hash BYTEA")
+            # SHA-256 of the clip content, checked again when the clip is retrieved
+            cursor.execute("ALTER TABLE temp_clips ADD COLUMN IF NOT EXISTS sha256 BYTEA")
+            # Set when the clip itself lives in Cloud Storage (see BUFFER_GCS_BUCKET)
+            cursor.execute("ALTER TABLE temp_clips ADD COLUMN IF NOT EXISTS gcs_uri TEXT")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS temp_clips_session_source_idx
+                ON temp_clips (session_id, source_url_hash)
+            """)
+            
             # Chunks table (for large files >10 MB)
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS temp_clip_chunks (
@@ -98,23 +235,15 @@ class CockroachBufferStorage:
             Clip ID (UUID) or None if failed
         """
         try:
-            # Read file data
+            # Map the file instead of reading it into a bytes object: the insert/COPY
+            # reads straight from the page cache, so the clip isn't held twice in memory
             with open(file_path, 'rb') as f:
-                clip_data = f.read()
-            
-            file_size_mb = len(clip_data) / (1024 * 1024)
-            
-            # CockroachDB has 16 MB message limit
-            # Use chunking for files >8 MB to be safe
-            # Chunk size: 6 MB (leaves room for encoding overhead - becomes ~12 MB message)
-            chunk_size = 6 * 1024 * 1024  # 6 MB chunks
-            
-            if file_size_mb > 8:
-                # Large file - use chunking
-                clip_id = self._store_clip_chunked(clip_data, media_type, file_size_mb, session_id, chunk_size)
-            else:
-                # Small file - store directly
-                clip_id = self._store_clip_direct(clip_data, media_type, file_size_mb, session_id)
+                if os.fstat(f.fileno()).st_size == 0:
+                    clip_id = self.store_clip_bytes(b'', media_type, session_id)
+                else:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                            memoryview(mm) as clip_data:
+                        clip_id = self.store_clip_bytes(clip_data, media_type, session_id)
             
             # Delete local file immediately to free memory
             if clip_id:
@@ -130,15 +259,81 @@ class CockroachBufferStorage:
             logger.error(f"❌ Failed to store clip in buffer: {e}")
             return None
     
-    def _store_clip_direct(self, clip_data: bytes, media_type: str, file_size_mb: float, session_id: str) -> Optional[str]:
+    def store_clip_bytes(self, clip_data: bytes, media_type: str, session_id: str,
+                         source_url_hash: bytes = None) -> Optional[str]:
+        """
+        Store in-memory clip data (bytes or memoryview) in CockroachDB buffer with automatic chunking
+        
+        Args:
+            clip_data: Raw media bytes, e.g. a download held in memory
+            media_type: 'video', 'photo' or 'audio'
+            session_id: Unique session identifier for this reel generation
+            source_url_hash: Optional hash of the source URL, see find_clip_by_hash()
+            
+        Returns:
+            Clip ID (UUID) or None if failed
+        """
+        try:
+            file_size_mb = len(clip_data) / (1024 * 1024)
+            
+            # CockroachDB has 16 MB message limit
+            # Use chunking for files >8 MB to be safe (see self.chunk_size for the chunk size)
+            
+            sha256 = hashlib.sha256(clip_data).digest()
+            
+            gcs_bucket = os.getenv('BUFFER_GCS_BUCKET')
+            if gcs_bucket and HAS_GCS and len(clip_data) > GCS_OFFLOAD_MIN_BYTES:
+                # Large clip - upload to Cloud Storage, keep a pointer row in the DB
+                clip_id = self._store_clip_gcs(clip_data, media_type, file_size_mb, session_id, gcs_bucket,
+                                               source_url_hash, sha256)
+                if clip_id:
+                    return clip_id
+                logger.warning("⚠️ GCS offload failed, storing clip in CockroachDB instead")
+            
+            if file_size_mb > 8:
+                # Large file - use chunking
+                return self._store_clip_chunked(clip_data, media_type, file_size_mb, session_id, self.chunk_size,
+                                                source_url_hash, sha256)
+            
+            # Small file - store directly
+            return self._store_clip_direct(clip_data, media_type, file_size_mb, session_id, source_url_hash, sha256)
+            
+        except Exception as e:
+            logger.error(f"❌ Failed to store clip in buffer: {e}")
+            return None
+    
+    @_synchronized
+    def find_clip_by_hash(self, source_url_hash: bytes, session_id: str) -> Optional[str]:
+        """Return the ID of a clip this session already stored from the same source URL, if any"""
+        try:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT id::text FROM temp_clips
+                WHERE session_id = %s AND source_url_hash = %s
+                LIMIT 1
+            """, (session_id, source_url_hash))
+            row = cursor.fetchone()
+            self.conn.commit()
+            cursor.close()
+            return row[0] if row else None
+            
+        except Exception as e:
+            self.conn.rollback()
+            logger.warning(f"⚠️ Clip lookup by source URL failed: {e}")
+            return None
+    
+    @_synchronized
+    def _store_clip_direct(self, clip_data: bytes, media_type: str, file_size_mb: float, session_id: str,
+                           source_url_hash: bytes = None, sha256: bytes = None) -> Optional[str]:
         """Store small clip directly in database"""
         try:
             cursor = self.conn.cursor()
             cursor.execute("""
-                INSERT INTO temp_clips (clip_data, media_type, file_size_mb, session_id, is_chunked, total_chunks)
-                VALUES (%s, %s, %s, %s, FALSE, 1)
+                INSERT INTO temp_clips (clip_data, media_type, file_size_mb, session_id, is_chunked, total_chunks,
+                                        source_url_hash, sha256)
+                VALUES (%s, %s, %s, %s, FALSE, 1, %s, %s)
                 RETURNING id::text
-            """, (clip_data, media_type, file_size_mb, session_id))
+            """, (clip_data, media_type, file_size_mb, session_id, source_url_hash, sha256))
             
             clip_id = cursor.fetchone()[0]
             self.conn.commit()
@@ -152,7 +347,71 @@ class CockroachBufferStorage:
             logger.error(f"❌ Failed to store clip directly: {e}")
             return None
     
-    def _store_clip_chunked(self, clip_data: bytes, media_type: str, file_size_mb: float, session_id: str, chunk_size: int) -> Optional[str]:
+    def _store_clip_gcs(self, clip_data: bytes, media_type: str, file_size_mb: float, session_id: str,
+                        bucket_name: str, source_url_hash: bytes = None, sha256: bytes = None) -> Optional[str]:
+        """Store large clip as a Cloud Storage object plus a pointer row"""
+        clip_id = str(uuid.uuid4())
+        gcs_uri = f"gs://{bucket_name}/{session_id}/{clip_id}"
+        try:
+            blob = get_gcs_client().bucket(bucket_name).blob(f"{session_id}/{clip_id}")
+            # Upload without holding the DB lock, so other threads keep using the connection
+            blob.upload_from_file(
+                BytesIO(clip_data),
+                size=len(clip_data),
+                content_type={'video': 'video/mp4', 'audio': 'audio/mpeg'}.get(media_type, 'image/jpeg'),
+                timeout=60
+            )
+        except Exception as e:
+            logger.error(f"❌ Failed to upload clip to {gcs_uri}: {e}")
+            return None
+        
+        with self._lock:
+            try:
+                cursor = self.conn.cursor()
+                cursor.execute("""
+                    INSERT INTO temp_clips (id, clip_data, media_type, file_size_mb, session_id, is_chunked, total_chunks,
+                                            source_url_hash, sha256, gcs_uri)
+                    VALUES (%s::uuid, %s, %s, %s, %s, FALSE, 0, %s, %s, %s)
+                """, (clip_id, b'', media_type, file_size_mb, session_id, source_url_hash, sha256, gcs_uri))
+                self.conn.commit()
+                cursor.close()
+                stored = True
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"❌ Failed to store GCS pointer for clip: {e}")
+                stored = False
+        
+        if not stored:
+            self._delete_gcs_objects([gcs_uri])
+            return None
+        
+        logger.info(f"☁️ Stored {media_type} clip in GCS: {file_size_mb:.2f} MB (ID: {clip_id})")
+        return clip_id
+    
+    def _delete_gcs_objects(self, gcs_uris):
+        """
+        Delete offloaded clip objects (best effort; a bucket lifecycle rule is the backstop)
+        
+        Called without the DB lock held, so other threads sharing the connection
+        aren't kept waiting on GCS round-trips.
+        """
+        gcs_uris = [uri for uri in gcs_uris if uri]
+        if not gcs_uris:
+            return
+        client = get_gcs_client()
+        if client is None:
+            logger.warning(f"⚠️ google-cloud-storage not installed, leaving {len(gcs_uris)} GCS objects")
+            return
+        try:
+            with client.batch():
+                for uri in gcs_uris:
+                    storage.Blob.from_string(uri, client=client).delete()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to delete GCS clip objects: {e}")
+    
+    @_synchronized
+    def _store_clip_chunked(self, clip_data: bytes, media_type: str, file_size_mb: float, session_id: str, chunk_size: int,
+                            source_url_hash: bytes = None, sha256: bytes = None) -> Optional[str]:
         """Store large clip in chunks"""
         try:
             cursor = self.conn.cursor()
@@ -162,28 +421,24 @@ class CockroachBufferStorage:
             
             # Create main clip entry (without data)
             cursor.execute("""
-                INSERT INTO temp_clips (clip_data, media_type, file_size_mb, session_id, is_chunked, total_chunks)
-                VALUES (%s, %s, %s, %s, TRUE, %s)
+                INSERT INTO temp_clips (clip_data, media_type, file_size_mb, session_id, is_chunked, total_chunks,
+                                        source_url_hash, sha256)
+                VALUES (%s, %s, %s, %s, TRUE, %s, %s, %s)
                 RETURNING id::text
-            """, (b'', media_type, file_size_mb, session_id, total_chunks))
+            """, (b'', media_type, file_size_mb, session_id, total_chunks, source_url_hash, sha256))
             
             clip_id = cursor.fetchone()[0]
-            self.conn.commit()
-            
-            # Store chunks
-            for i in range(total_chunks):
-                start = i * chunk_size
-                end = min(start + chunk_size, len(clip_data))
-                chunk = clip_data[start:end]
-                
-                cursor.execute("""
-                    INSERT INTO temp_clip_chunks (clip_id, chunk_number, chunk_data)
-                    VALUES (%s::uuid, %s, %s)
-                """, (clip_id, i, chunk))
-                self.conn.commit()
-                
-                logger.info(f"   💾 Chunk {i+1}/{total_chunks}: {len(chunk)/(1024*1024):.2f} MB")
             
+            # All chunks in one binary COPY (one statement instead of an INSERT round-trip
+            # per chunk) and one commit with the metadata row, so a failure leaves nothing behind
+            clip_view = memoryview(clip_data)
+            cursor.copy_expert(
+                "COPY temp_clip_chunks (clip_id, chunk_number, chunk_data) FROM STDIN WITH BINARY",
+                ChunkCopyStream(clip_id, (clip_view[start:start + chunk_size]
+                                          for start in range(0, len(clip_view), chunk_size))),
+                size=chunk_size
+            )
+            self.conn.commit()
             cursor.close()
             
             logger.info(f"💾 Stored {media_type} clip in buffer (CHUNKED): {file_size_mb:.2f} MB in {total_chunks} chunks (ID: {clip_id})")
@@ -194,6 +449,38 @@ class CockroachBufferStorage:
             logger.error(f"❌ Failed to store clip in chunks: {e}")
             return None
     
+    def _end_read(self):
+        """Roll back the current read transaction (a dropped connection has nothing to roll back)"""
+        if not self.conn.closed:
+            self.conn.rollback()
+    
+    def _stream_chunks_to_file(self, query: str, params: tuple, out_file, digest=None) -> int:
+        """
+        Write chunk_data rows to out_file through a server-side cursor
+        
+        Only itersize rows (up to chunk_size each) are held in memory at a time.
+        If digest (a hashlib object) is given, it is updated with every chunk written.
+        
+        Returns:
+            Number of chunks written
+        """
+        cursor = self.conn.cursor(name='chunk_stream')
+        cursor.itersize = 2
+        try:
+            cursor.execute(query, params)
+            chunks_written = 0
+            for (chunk_data,) in cursor:
+                out_file.write(chunk_data)
+                if digest is not None:
+                    digest.update(chunk_data)
+                chunks_written += 1
+        finally:
+            cursor.close()
+            # End the read transaction the named cursor lives in
+            self._end_read()
+        return chunks_written
+    
+    @_synchronized
     def retrieve_clip(self, clip_id: str) -> Optional[str]:
         """
         Retrieve clip from CockroachDB buffer to temporary file
@@ -204,72 +491,81 @@ class CockroachBufferStorage:
         Returns:
             Path to temporary file or None if failed
         """
+        temp_path = None
         try:
             cursor = self.conn.cursor()
-            # Check if chunked
+            # Metadata and (for unchunked clips) the data in one primary-key lookup;
+            # chunked clips store an empty clip_data, so nothing extra is fetched for them
             cursor.execute("""
-                SELECT is_chunked, media_type, file_size_mb, total_chunks
+                SELECT is_chunked, media_type, file_size_mb, total_chunks, clip_data, sha256, gcs_uri
                 FROM temp_clips
-                WHERE id::text = %s
+                WHERE id = %s::uuid
             """, (str(clip_id),))
             
             row = cursor.fetchone()
+            cursor.close()
+            self._end_read()  # Chunks are read in their own transaction
             
             if not row:
-                cursor.close()
                 logger.error(f"❌ Clip not found: {clip_id}")
                 return None
             
-            is_chunked, media_type, file_size_mb, total_chunks = row
+            is_chunked, media_type, file_size_mb, total_chunks, clip_data, expected_sha256, gcs_uri = row
+            digest = hashlib.sha256()
             
-            if is_chunked:
-                # Retrieve and reassemble chunks
-                cursor.execute("""
-                    SELECT chunk_data
-                    FROM temp_clip_chunks
-                    WHERE clip_id::text = %s
-                    ORDER BY chunk_number
-                """, (str(clip_id),))
+            suffix = '.mp4' if media_type == 'video' else '.jpg'
+            
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+            temp_path = temp_file.name  # Removed in the except block if anything below fails
+            
+            if gcs_uri:
+                temp_file.close()
+                download_gcs_clip(gcs_uri, temp_file.name)
+                with open(temp_file.name, 'rb') as f:
+                    digest = hashlib.file_digest(f, 'sha256')
                 
-                chunks = [bytes(row[0]) for row in cursor.fetchall()]
-                cursor.close()
+                logger.info(f"📥 Retrieved {media_type} clip from GCS: {file_size_mb:.2f} MB")
+            elif is_chunked:
+                # Stream chunks to the temp file instead of reassembling in memory
+                with temp_file:
+                    chunks_written = self._stream_chunks_to_file("""
+                        SELECT chunk_data
+                        FROM temp_clip_chunks
+                        WHERE clip_id = %s::uuid
+                        ORDER BY chunk_number
+                    """, (str(clip_id),), temp_file, digest)
                 
-                if len(chunks) != total_chunks:
-                    logger.error(f"❌ Missing chunks: expected {total_chunks}, got {len(chunks)}")
+                if chunks_written != total_chunks:
+                    os.unlink(temp_file.name)
+                    logger.error(f"❌ Missing chunks: expected {total_chunks}, got {chunks_written}")
                     return None
                 
-                clip_data = b''.join(chunks)
                 logger.info(f"📥 Retrieved {media_type} clip from buffer (CHUNKED): {file_size_mb:.2f} MB from {total_chunks} chunks")
             else:
-                # Retrieve normally
-                cursor.execute("""
-                    SELECT clip_data
-                    FROM temp_clips
-                    WHERE id::text = %s
-                """, (str(clip_id),))
-                
-                row = cursor.fetchone()
-                cursor.close()
-                
-                if not row:
-                    logger.error(f"❌ Clip data not found: {clip_id}")
-                    return None
-                
-                clip_data = bytes(row[0])
+                # clip_data is a bytea memoryview, written to the file as-is
                 logger.info(f"📥 Retrieved {media_type} clip from buffer: {file_size_mb:.2f} MB")
-            
-            # Save to temp file
-            suffix = '.mp4' if media_type == 'video' else '.jpg'
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            temp_file.write(clip_data)
-            temp_file.close()
+                
+                # Save to temp file
+                temp_file.write(clip_data)
+                temp_file.close()
+                digest.update(clip_data)
+            
+            # Clips stored before checksums were added have no sha256 to compare
+            if expected_sha256 is not None and digest.digest() != bytes(expected_sha256):
+                os.unlink(temp_file.name)
+                logger.error(f"❌ Checksum mismatch for clip {clip_id}, discarding corrupted data")
+                return None
             
             return temp_file.name
             
         except Exception as e:
+            self._end_read()
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
             logger.error(f"❌ Failed to retrieve clip from buffer: {e}")
             return None
     
+    @_synchronized
     def retrieve_processed_video(self, video_id: str) -> Optional[str]:
         """
         Retrieve processed video from Cloud Run stored in CockroachDB
@@ -280,82 +576,81 @@ class CockroachBufferStorage:
         Returns:
             Path to temporary file or None if failed
         """
+        temp_path = None
         try:
             cursor = self.conn.cursor()
-            # Check if chunked
+            # Metadata and (for unchunked videos) the data in one primary-key lookup
             cursor.execute("""
-                SELECT is_chunked, file_size_mb, total_chunks
+                SELECT is_chunked, file_size_mb, total_chunks, video_data
                 FROM processed_videos
-                WHERE id::text = %s
+                WHERE id = %s::uuid
             """, (str(video_id),))
             
             row = cursor.fetchone()
+            cursor.close()
+            self._end_read()  # Chunks are read in their own transaction
             
             if not row:
-                cursor.close()
                 logger.error(f"❌ Processed video not found: {video_id}")
                 return None
             
-            is_chunked, file_size_mb, total_chunks = row
+            is_chunked, file_size_mb, total_chunks, video_data = row
+            
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
+            temp_path = temp_file.name  # Removed in the except block if anything below fails
             
             if is_chunked:
-                # Retrieve and reassemble chunks
-                cursor.execute("""
-                    SELECT chunk_data
-                    FROM processed_video_chunks
-                    WHERE video_id::text = %s
-                    ORDER BY chunk_number
-                """, (str(video_id),))
+                # Stream chunks to the temp file instead of reassembling in memory
+                with temp_file:
+                    chunks_written = self._stream_chunks_to_file("""
+                        SELECT chunk_data
+                        FROM processed_video_chunks
+                        WHERE video_id = %s::uuid
+                        ORDER BY chunk_number
+                    """, (str(video_id),), temp_file)
                 
-                chunks = [bytes(row[0]) for row in cursor.fetchall()]
-                cursor.close()
-                
-                if len(chunks) != total_chunks:
-                    logger.error(f"❌ Missing chunks: expected {total_chunks}, got {len(chunks)}")
+                if chunks_written != total_chunks:
+                    os.unlink(temp_file.name)
+                    logger.error(f"❌ Missing chunks: expected {total_chunks}, got {chunks_written}")
                     return None
                 
-                video_data = b''.join(chunks)
                 logger.info(f"📥 Retrieved processed video (CHUNKED): {file_size_mb:.2f} MB from {total_chunks} chunks")
+                return temp_file.name
             else:
-                # Retrieve normally
-                cursor.execute("""
-                    SELECT video_data
-                    FROM processed_videos
-                    WHERE id::text = %s
-                """, (str(video_id),))
-                
-                row = cursor.fetchone()
-                cursor.close()
-                
-                if not row:
-                    logger.error(f"❌ Processed video data not found: {video_id}")
-                    return None
-                
-                video_data = bytes(row[0])
+                # video_data is a bytea memoryview, written to the file as-is
                 logger.info(f"📥 Retrieved processed video: {file_size_mb:.2f} MB")
             
             # Save to temp file
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
             temp_file.write(video_data)
             temp_file.close()
             
             return temp_file.name
             
         except Exception as e:
+            self._end_read()
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
             logger.error(f"❌ Failed to retrieve processed video: {e}")
             return None
     
     def delete_clip(self, clip_id: str):
-        """Delete a single clip from buffer (including chunks if chunked)"""
+        """Delete a single clip from buffer (including chunks if chunked, and its GCS object)"""
+        # GCS deletes happen after the DB lock is released (see _delete_gcs_objects)
+        self._delete_gcs_objects(self._delete_clip_rows(clip_id))
+    
+    @_synchronized
+    def _delete_clip_rows(self, clip_id: str) -> list:
+        """Delete a clip's rows; returns the GCS URIs left to remove"""
         try:
             cursor = self.conn.cursor()
             
             # Delete chunks first (if any)
-            cursor.execute("DELETE FROM temp_clip_chunks WHERE clip_id::text = %s", (str(clip_id),))
+            cursor.execute("DELETE FROM temp_clip_chunks WHERE clip_id = %s::uuid", (str(clip_id),))
             chunks_deleted = cursor.rowcount
             
             # Delete main clip entry
-            cursor.execute("DELETE FROM temp_clips WHERE id::text = %s", (str(clip_id),))
+            cursor.execute("DELETE FROM temp_clips WHERE id = %s::uuid RETURNING gcs_uri", (str(clip_id),))
+            gcs_uris = [uri for (uri,) in cursor.fetchall()]
             
             self.conn.commit()
             cursor.close()
@@ -364,71 +659,87 @@ class CockroachBufferStorage:
                 logger.info(f"🗑️ Deleted clip from buffer (and {chunks_deleted} chunks): {clip_id}")
             else:
                 logger.info(f"🗑️ Deleted clip from buffer: {clip_id}")
+            return gcs_uris
             
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ Failed to delete clip: {e}")
+            return []
     
     def delete_session_clips(self, session_id: str):
-        """Delete all clips for a session (including chunks)"""
+        """Delete all clips for a session (including chunks and GCS objects)"""
+        self._delete_gcs_objects(self._delete_session_rows(session_id))
+    
+    @_synchronized
+    def _delete_session_rows(self, session_id: str) -> list:
+        """Delete a session's clip rows; returns the GCS URIs left to remove"""
         try:
             cursor = self.conn.cursor()
             
-            # Get all clip IDs for this session
-            cursor.execute("SELECT id::text FROM temp_clips WHERE session_id = %s", (session_id,))
-            clip_ids = [row[0] for row in cursor.fetchall()]
-            
-            # Delete chunks for all clips in session
-            for clip_id in clip_ids:
-                cursor.execute("DELETE FROM temp_clip_chunks WHERE clip_id::text = %s", (clip_id,))
+            # Delete chunks for all clips in session - one set-based statement, not one per clip
+            cursor.execute("""
+                DELETE FROM temp_clip_chunks
+                WHERE clip_id IN (SELECT id FROM temp_clips WHERE session_id = %s)
+            """, (session_id,))
             
             # Delete main clip entries
-            cursor.execute("DELETE FROM temp_clips WHERE session_id = %s", (session_id,))
-            deleted_count = cursor.rowcount
+            cursor.execute("DELETE FROM temp_clips WHERE session_id = %s RETURNING gcs_uri", (session_id,))
+            gcs_uris = [uri for (uri,) in cursor.fetchall()]
+            deleted_count = len(gcs_uris)
             
             self.conn.commit()
             cursor.close()
             
             if deleted_count > 0:
                 logger.info(f"🗑️ Deleted {deleted_count} clips from session: {session_id}")
+            return gcs_uris
             
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ Failed to delete session clips: {e}")
+            return []
     
     def cleanup_old_clips(self, hours: int = 2):
-        """Delete clips older than specified hours (safety cleanup, including chunks)"""
+        """Delete clips older than specified hours (safety cleanup, including chunks and GCS objects)"""
+        self._delete_gcs_objects(self._delete_old_rows(hours))
+    
+    @_synchronized
+    def _delete_old_rows(self, hours: int) -> list:
+        """Delete clip rows older than hours; returns the GCS URIs left to remove"""
         try:
             cursor = self.conn.cursor()
             
-            # Get old clip IDs
+            # Delete chunks for old clips - one set-based statement, not one per clip
             cursor.execute("""
-                SELECT id::text FROM temp_clips
-                WHERE created_at < NOW() - INTERVAL '%s hours'
+                DELETE FROM temp_clip_chunks
+                WHERE clip_id IN (
+                    SELECT id FROM temp_clips
+                    WHERE created_at < NOW() - INTERVAL '%s hours'
+                )
             """, (hours,))
-            old_clip_ids = [row[0] for row in cursor.fetchall()]
-            
-            # Delete chunks for old clips
-            for clip_id in old_clip_ids:
-                cursor.execute("DELETE FROM temp_clip_chunks WHERE clip_id::text = %s", (clip_id,))
             
             # Delete old clips
             cursor.execute("""
                 DELETE FROM temp_clips
                 WHERE created_at < NOW() - INTERVAL '%s hours'
+                RETURNING gcs_uri
             """, (hours,))
             
-            deleted_count = cursor.rowcount
+            gcs_uris = [uri for (uri,) in cursor.fetchall()]
+            deleted_count = len(gcs_uris)
             self.conn.commit()
             cursor.close()
             
             if deleted_count > 0:
                 logger.info(f"🧹 Cleaned up {deleted_count} old clips (>{hours}h)")
+            return gcs_uris
             
         except Exception as e:
             self.conn.rollback()
             logger.error(f"❌ Failed to cleanup old clips: {e}")
+            return []
     
+    @_synchronized
     def get_buffer_stats(self):
         """Get statistics about buffer usage"""
         try:
@@ -461,6 +772,7 @@ class CockroachBufferStorage:
             logger.error(f"❌ Failed to get buffer stats: {e}")
             return {'total_clips': 0, 'total_mb': 0}
     
+    @_synchronized
     def close(self):
         """Close database connection"""
         if self.conn:
@@ -27,6 +27,7 @@ gcloud run deploy $SERVICE_NAME \
   --memory 4Gi \
   --cpu 2 \
   --timeout 600 \
+  --concurrency 4 \
   --allow-unauthenticated \
   --set-env-vars "COCKROACHDB_URI=$COCKROACHDB_URI,GROQ_API_KEY=$GROQ_API_KEY,PEXEL=$PEXEL,NYT_API_KEY=$NYT_API_KEY,GOOGLE_API_KEY=$GOOGLE_API_KEY"
 
@@ -5,6 +5,8 @@ FREE alternative to ElevenLabs with good quality
 
 import os
 import json
+import hashlib
+import shutil
 import tempfile
 import logging
 import requests
@@ -19,12 +21,22 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Narration cache for local/test runs (pass as cache_dir); TTS_CACHE_DIR overrides the location
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.expanduser('~/.cache/animatedreel_tts'))
+
 class GoogleTTSVoice:
     """Generate voice narration using Google Cloud TTS"""
     
-    def __init__(self):
-        """Initialize Google TTS client"""
+    def __init__(self, cache_dir=None):
+        """
+        Initialize Google TTS client
+        
+        Args:
+            cache_dir: Optional directory of previously generated MP3s keyed by (text, voice);
+                       repeated narrations are copied from it instead of calling Google TTS
+        """
         self.client = None
+        self.cache_dir = cache_dir
         self.api_key = os.getenv('GOOGLE_TTS_API_KEY')  # Simple API key (best for Render)
         self.use_rest_api = bool(self.api_key)  # Use REST API if API key is available
         
@@ -92,11 +104,35 @@ class GoogleTTSVoice:
         Returns:
             Path to generated audio file or None if failed
         """
+        cached_path = None
+        if self.cache_dir:
+            key = hashlib.sha256(f"{voice_name}\n{text}".encode('utf-8')).hexdigest()
+            cached_path = os.path.join(self.cache_dir, f"{key}.mp3")
+            if os.path.exists(cached_path):
+                shutil.copyfile(cached_path, output_path)
+                logger.info(f"♻️ Reused cached voice: {cached_path}")
+                return output_path
+        
         # Use REST API if API key is available (simpler for Render)
         if self.use_rest_api:
-            return self._generate_voice_rest_api(text, output_path, voice_name)
+            result = self._generate_voice_rest_api(text, output_path, voice_name)
+        else:
+            result = self._generate_voice_client(text, output_path, voice_name)
         
-        # Otherwise use Python client library
+        if result and cached_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                # Copy under a temp name first so a concurrent reader never sees a partial file
+                temp_path = f"{cached_path}.{os.getpid()}.tmp"
+                shutil.copyfile(result, temp_path)
+                os.replace(temp_path, cached_path)
+            except OSError as e:
+                logger.warning(f"⚠️ Could not cache voice: {e}")
+        
+        return result
+    
+    def _generate_voice_client(self, text, output_path, voice_name="en-US-Studio-O"):
+        """Generate voice using the Google Cloud TTS Python client library"""
         if not self.client:
             logger.error("❌ Google TTS client not initialized")
             return None
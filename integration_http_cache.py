@@ -0,0 +1,35 @@
+"""
+Optional HTTP cache for the integration scripts (test_single_reel, test_full_integration)
+Caches NYT/Pexels API GETs between local runs when requests-cache is installed
+"""
+
+import os
+
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.test_http_cache')
+
+def install_api_cache() -> bool:
+    """
+    Patch requests to cache NYT/Pexels API GETs for an hour (pip install requests-cache);
+    media downloads and everything else still go to the network
+    
+    Returns:
+        True if the cache was installed, False if requests-cache isn't available
+    """
+    if not HAS_REQUESTS_CACHE:
+        return False
+    requests_cache.install_cache(
+        CACHE_PATH,
+        allowable_methods=('GET',),
+        urls_expire_after={
+            'api.nytimes.com': 3600,
+            'api.pexels.com': 3600,
+            '*': requests_cache.DO_NOT_CACHE,
+        },
+    )
+    return True
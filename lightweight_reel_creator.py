@@ -6,6 +6,8 @@ Render service only handles: orchestration, overlays, and database storage
 import os
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import tempfile
 import numpy as np
 from typing import List, Dict, Optional
@@ -38,9 +40,24 @@ class LightweightReelCreator:
             'https://video-processor-flqsiu3bra-el.a.run.app'
         )
         
+        # Keep-alive session for Cloud Run calls, reused across reels
+        # (POSTs are only retried on connection errors, never after being sent)
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+        ))
+        self._pexels_fetcher = None
+        
         from anchor_overlay import AnchorOverlaySystem
         self.anchor_system = AnchorOverlaySystem()
     
+    def _get_pexels_fetcher(self):
+        """One Pexels fetcher (HTTP session + Groq client) per creator, created on first use"""
+        if self._pexels_fetcher is None:
+            from pexels_video_fetcher import PexelsMediaFetcher
+            self._pexels_fetcher = PexelsMediaFetcher()
+        return self._pexels_fetcher
+    
     def create_animated_reel(
         self,
         headline: str,
@@ -53,7 +70,8 @@ class LightweightReelCreator:
     ) -> Optional[str]:
         """
         Create animated reel using Cloud Run for ALL heavy processing
-        Render only: fetch clips, upload metadata, retrieve final video
+        Render only: find clip URLs, upload the voice, retrieve final video
+        (Cloud Run downloads the clips straight from Pexels)
         
         Args:
             headline: News headline
@@ -73,25 +91,22 @@ class LightweightReelCreator:
             # Fetch clips if not provided
             if clips_urls is None:
                 logger.info(f"📥 Fetching {clips_count} clips from Pexels...")
-                from pexels_video_fetcher import PexelsMediaFetcher
-                pexels_fetcher = PexelsMediaFetcher()
+                pexels_fetcher = self._get_pexels_fetcher()
                 
                 # Extract keywords and search for videos
                 keywords = pexels_fetcher.extract_search_keywords(headline, commentary)
                 
-                clips_urls = []
-                for keyword in keywords[:3]:  # Use top 3 keywords
-                    videos = pexels_fetcher.search_videos(keyword, per_page=3, orientation='portrait')
-                    for video in videos:
-                        clips_urls.append({
-                            'url': video['url'],
-                            'type': 'video',
-                            'duration': video.get('duration', 3.0)
-                        })
-                        if len(clips_urls) >= clips_count:
-                            break
-                    if len(clips_urls) >= clips_count:
-                        break
+                # Search the top 3 keywords concurrently, keeping keyword order
+                search_results = pexels_fetcher.search_videos_batch(keywords[:3], per_page=3, orientation='portrait')
+                clips_urls = [
+                    {
+                        'url': video['url'],
+                        'type': 'video',
+                        'duration': video.get('duration', 3.0)
+                    }
+                    for videos in search_results
+                    for video in videos
+                ]
                 
                 if not clips_urls:
                     logger.error("❌ Failed to fetch clips from Pexels")
@@ -101,34 +116,22 @@ class LightweightReelCreator:
                 clips_urls = clips_urls[:clips_count]
                 logger.info(f"✅ Fetched {len(clips_urls)} clips from Pexels")
             
-            # Step 1: Download clips and voice audio to buffer
-            logger.info(f"📥 Downloading {len(clips_urls)} clips from Pexels to buffer...")
+            # Step 1: Clips go to Cloud Run as URLs - it downloads them from Pexels itself,
+            # so they never pass through Render or the CockroachDB buffer
+            clip_urls = [
+                {'url': clip['url'], 'type': clip.get('type', 'video')}
+                for clip in clips_urls
+                if clip.get('url')
+            ]
+            if not clip_urls:
+                logger.error("❌ No clip URLs to send to Cloud Run")
+                return None
             
-            from pexels_video_fetcher import PexelsMediaFetcher
             import uuid
             
-            pexels_fetcher = PexelsMediaFetcher()
+            from cockroach_buffer import CockroachBufferStorage
+            buffer = CockroachBufferStorage.get_default()
             session_id = str(uuid.uuid4())  # Session ID for this reel
-            clip_ids = []
-            
-            for i, clip_info in enumerate(clips_urls):
-                url = clip_info['url']
-                media_type = clip_info['type']
-                
-                logger.info(f"  Downloading clip {i+1}/{len(clips_urls)}...")
-                clip_id = pexels_fetcher.download_media(url, media_type, session_id)
-                
-                if clip_id:
-                    clip_ids.append(clip_id)
-                    logger.info(f"  ✅ Stored in buffer (ID: {clip_id})")
-                else:
-                    logger.warning(f"  ⚠️ Failed to download clip {i+1}")
-            
-            if not clip_ids:
-                logger.error("❌ No clips were successfully downloaded to buffer")
-                return None
-            
-            logger.info(f"✅ Downloaded {len(clip_ids)} clips to buffer")
             
             # Step 2: Upload voice audio to buffer for Cloud Run
             voice_audio_id = None
@@ -136,7 +139,7 @@ class LightweightReelCreator:
                 logger.info("🎤 Uploading voice audio to buffer...")
                 with open(voice_audio_path, 'rb') as f:
                     voice_audio_data = f.read()
-                voice_audio_id = pexels_fetcher.buffer.store_clip(
+                voice_audio_id = buffer.store_clip_bytes(
                     voice_audio_data,
                     media_type='audio',
                     session_id=session_id
@@ -149,10 +152,10 @@ class LightweightReelCreator:
             
             # Send request with ALL data needed for complete reel
             try:
-                response = requests.post(
+                response = self.session.post(
                     f'{self.cloud_processor_url}/create-complete-reel',
                     json={
-                        'clip_ids': clip_ids,
+                        'clip_urls': clip_urls,
                         'headline': headline,
                         'commentary': commentary,
                         'voice_audio_id': voice_audio_id,
@@ -184,8 +187,6 @@ class LightweightReelCreator:
             # Step 4: Retrieve final processed video from buffer (NO further processing on Render!)
             logger.info(f"📥 Retrieving final reel from buffer...")
             
-            from cockroach_buffer import CockroachBufferStorage
-            buffer = CockroachBufferStorage()
             final_video_path = buffer.retrieve_processed_video(video_id)
             
             if not final_video_path:
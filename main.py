@@ -8,24 +8,111 @@ from flask import Flask, request, jsonify
 import tempfile
 import os
 import gc
+import functools
+import hashlib
 import uuid
-from decimal import Decimal
-from moviepy.editor import VideoFileClip, ImageClip, concatenate_videoclips
+import mmap
+import re
+import subprocess
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from moviepy.editor import ImageClip
+import imageio_ffmpeg
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+from cockroach_buffer import ChunkCopyStream, download_gcs_clip, MAX_CLIP_BYTES
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Max clips retrieved/encoded concurrently per request (bounded for the 4 GB instance)
+MAX_CLIP_WORKERS = 4
+
+# Same ffmpeg build MoviePy uses (bundled by imageio-ffmpeg, or IMAGEIO_FFMPEG_EXE)
+FFMPEG_BINARY = imageio_ffmpeg.get_ffmpeg_exe()
+FFMPEG_DURATION_RE = re.compile(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)')
+
+# libx264 settings by output size: (max pixels per frame, max duration s, preset, threads).
+# threads=0 lets x264 pick its own count from the instance's cores. The last row is the default.
+ENCODER_PRESETS = [
+    (1080 * 1920, 120, 'veryfast', 0),
+    (1080 * 1920, float('inf'), 'superfast', 0),
+    (float('inf'), float('inf'), 'fast', 0),
+]
+
+# Extra libx264 options for the final MoviePy encode. Frames arrive one at a time over a
+# pipe, so slice threads keep cores busy where frame threads would wait on lookahead.
+# Per-clip segments don't use this: they already run MAX_CLIP_WORKERS encodes side by side.
+X264_PIPED_PARAMS = ['-x264-params', 'sliced-threads=1:lookahead-threads=2']
+
+# Used instead of libx264 when ffmpeg can reach an NVIDIA GPU (see nvenc_available).
+# MoviePy only adds -pix_fmt yuv420p for libx264; without it NVENC would encode its rgb24
+# frames as 4:4:4 (High 4:4:4), which many players and Instagram reject.
+NVENC_PRESET = 'p4'
+NVENC_PARAMS = ['-rc', 'vbr', '-cq', '23', '-pix_fmt', 'yuv420p']
+
+# Keep-alive HTTP session for outbound fetches (NYT images), with light retries
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=20,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+))
+
+# Clips passed by source URL (clip_urls) are streamed to /tmp (memory on Cloud Run), capped at
+# MAX_CLIP_BYTES, and only from Pexels' media hosts - the service is publicly reachable
+CLIP_URL_HOSTS = frozenset({'videos.pexels.com', 'images.pexels.com'})
+URL_CLIP_CHUNK_SIZE = 1024 * 1024
+
+# Pooled CockroachDB connections, created on first use (see get_db_connection)
+DB_POOL_MAX_CONNECTIONS = 32
+db_pool = None
+_db_pool_lock = threading.Lock()
+
+# Shared TTS / Pexels clients, built on first use (see get_tts_voice / get_pexels_fetcher)
+tts_voice = None
+pexels_fetcher = None
+_clients_lock = threading.Lock()
+
+# Set once processed_videos / processed_video_chunks are known to exist
+_schema_ready = False
+_schema_lock = threading.Lock()
+
 # Monkey-patch for PIL compatibility
 from PIL import Image
 if not hasattr(Image, 'ANTIALIAS'):
     Image.ANTIALIAS = Image.LANCZOS
 
 def get_db_connection():
-    """Connect to CockroachDB"""
+    """
+    Get a pooled CockroachDB connection
+    
+    Callers must hand it back with release_db_connection() (use try/finally).
+    """
+    global db_pool
+    with _db_pool_lock:
+        if db_pool is None:
+            db_pool = ThreadedConnectionPool(
+                1, DB_POOL_MAX_CONNECTIONS, _get_db_url(),
+                keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3
+            )
+            logger.info("✅ CockroachDB connection pool ready")
+    return db_pool.getconn()
+
+def release_db_connection(conn):
+    """Return a connection to the pool (an open transaction is rolled back; dead connections are dropped)"""
+    db_pool.putconn(conn, close=bool(conn.closed))
+
+def _get_db_url():
+    """Build the CockroachDB URL from COCKROACHDB_URI"""
     db_url = os.environ.get('COCKROACHDB_URI')
     if not db_url:
         raise ValueError("COCKROACHDB_URI not set")
@@ -41,7 +128,73 @@ def get_db_connection():
     else:
         db_url += '?sslmode=require'
     
-    return psycopg2.connect(db_url)
+    return db_url
+
+def pick_preset(width: int, height: int, duration: float):
+    """
+    Pick libx264 preset and thread count for an encode
+    
+    Returns:
+        (preset, threads) from the first ENCODER_PRESETS row that fits
+        (the last row is the catch-all default)
+    """
+    pixels = width * height
+    for max_pixels, max_duration, preset, threads in ENCODER_PRESETS[:-1]:
+        if pixels <= max_pixels and duration <= max_duration:
+            return preset, threads
+    _, _, preset, threads = ENCODER_PRESETS[-1]
+    return preset, threads
+
+def get_tts_voice():
+    """Get or create the shared Google TTS client"""
+    global tts_voice
+    with _clients_lock:
+        if tts_voice is None:
+            from google_tts_voice import GoogleTTSVoice
+            logger.info("🎤 Initializing Google TTS client...")
+            tts_voice = GoogleTTSVoice()
+    return tts_voice
+
+def get_pexels_fetcher():
+    """Get or create the shared Pexels fetcher (and its buffer connection)"""
+    global pexels_fetcher
+    with _clients_lock:
+        if pexels_fetcher is None:
+            from pexels_video_fetcher import PexelsMediaFetcher
+            logger.info("📥 Initializing Pexels fetcher...")
+            pexels_fetcher = PexelsMediaFetcher()
+        elif pexels_fetcher.buffer.conn.closed:
+            # Idle instance lost its DB connection; reconnect before reuse
+            pexels_fetcher.buffer.connect()
+    return pexels_fetcher
+
+@functools.lru_cache(maxsize=None)
+def nvenc_available() -> bool:
+    """Check once whether h264_nvenc actually works (ffmpeg lists it even without a GPU)"""
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+             '-f', 'lavfi', '-i', 'color=black:s=256x256:d=0.1',
+             '-c:v', 'h264_nvenc', '-f', 'null', '-'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30
+        )
+        available = result.returncode == 0
+    except Exception:
+        available = False
+    logger.info(f"🎞️ H.264 encoder: {'h264_nvenc (GPU)' if available else 'libx264 (CPU)'}")
+    return available
+
+def pick_encoder(width: int, height: int, duration: float):
+    """
+    Pick H.264 encoder settings, preferring NVENC when a GPU is available
+    
+    Returns:
+        (codec, preset, threads, extra ffmpeg params)
+    """
+    if nvenc_available():
+        return 'h264_nvenc', NVENC_PRESET, 0, NVENC_PARAMS
+    preset, threads = pick_preset(width, height, duration)
+    return 'libx264', preset, threads, []
 
 def retrieve_clip_from_buffer(clip_id: str) -> str:
     """
@@ -53,13 +206,16 @@ def retrieve_clip_from_buffer(clip_id: str) -> str:
     Returns:
         Path to temp file, or None if failed
     """
+    conn = None
     try:
         conn = get_db_connection()
+        _ensure_schema(conn)
         cursor = conn.cursor()
         
-        # Get clip metadata from temp_clips (matches CockroachBufferStorage schema)
+        # Get clip metadata (and inline data for unchunked clips) in one round-trip
+        # (matches CockroachBufferStorage schema; clip_data is empty for chunked and GCS clips)
         cursor.execute("""
-            SELECT media_type, is_chunked, total_chunks, file_size_mb
+            SELECT media_type, is_chunked, total_chunks, file_size_mb, clip_data, gcs_uri, sha256
             FROM temp_clips
             WHERE id = %s
         """, (clip_id,))
@@ -68,74 +224,238 @@ def retrieve_clip_from_buffer(clip_id: str) -> str:
         if not row:
             logger.error(f"❌ Clip {clip_id} not found in buffer (temp_clips)")
             cursor.close()
-            conn.close()
             return None
 
-        media_type, is_chunked, total_chunks, file_size_mb = row
+        media_type, is_chunked, total_chunks, file_size_mb, clip_data, gcs_uri, expected_sha256 = row
 
-        # Retrieve chunks or direct data depending on is_chunked
-        clip_bytes = b''
-        if is_chunked:
-            cursor.execute("""
+        if not is_chunked and clip_data is None:
+            logger.error(f"❌ Clip data not found for {clip_id} in temp_clips")
+            cursor.close()
+            return None
+
+        suffix = {'video': '.mp4', 'audio': '.mp3'}.get(media_type, '.jpg')
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+        digest = hashlib.sha256()
+
+        if gcs_uri:
+            # Offloaded clip: only the pointer is in the DB, fetch the object directly
+            temp_file.close()
+            cursor.close()
+            conn.rollback()  # End the read transaction before the download
+            try:
+                download_gcs_clip(gcs_uri, temp_file.name)
+                with open(temp_file.name, 'rb') as f:
+                    digest = hashlib.file_digest(f, 'sha256')
+            except Exception:
+                os.unlink(temp_file.name)
+                raise
+        elif is_chunked:
+            # Reserve the clip's space up front so a full /tmp (memory on Cloud Run)
+            # fails here rather than partway through the download
+            if file_size_mb and hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(temp_file.fileno(), 0, int(file_size_mb * 1024 * 1024))
+                except OSError as e:
+                    logger.warning(f"⚠️ Could not preallocate clip file: {e}")
+            
+            # Stream chunks straight to disk through a server-side cursor, so only
+            # a couple of chunks are in memory at once
+            chunk_cursor = conn.cursor(name='clip_chunks')
+            chunk_cursor.itersize = 2
+            chunk_cursor.execute("""
                 SELECT chunk_data
                 FROM temp_clip_chunks
                 WHERE clip_id = %s
                 ORDER BY chunk_number
             """, (clip_id,))
 
-            chunk_rows = cursor.fetchall()
-            if not chunk_rows:
+            chunks_written = 0
+            for (chunk_data,) in chunk_cursor:
+                temp_file.write(chunk_data)
+                digest.update(chunk_data)
+                chunks_written += 1
+            chunk_cursor.close()
+            temp_file.truncate()  # Drop any preallocated tail past the real size
+
+            if not chunks_written:
                 logger.error(f"❌ No chunks found for clip {clip_id} in temp_clip_chunks")
+                temp_file.close()
+                os.unlink(temp_file.name)
                 cursor.close()
-                conn.close()
                 return None
-
-            for chunk_row in chunk_rows:
-                clip_bytes += bytes(chunk_row[0])
         else:
-            cursor.execute("""
-                SELECT clip_data
-                FROM temp_clips
-                WHERE id = %s
-            """, (clip_id,))
-
-            data_row = cursor.fetchone()
-            if not data_row or data_row[0] is None:
-                logger.error(f"❌ Clip data not found for {clip_id} in temp_clips")
-                cursor.close()
-                conn.close()
-                return None
-
-            clip_bytes = bytes(data_row[0])
+            temp_file.write(clip_data)
+            digest.update(clip_data)
 
-        # Combine bytes into temp file
-        suffix = '.mp4' if media_type == 'video' else '.jpg'
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-        temp_file.write(clip_bytes)
-        
         temp_file.close()
         
         cursor.close()
-        conn.close()
         
-        logger.info(f"✅ Retrieved clip {clip_id} from buffer")
+        # Same check as CockroachBufferStorage.retrieve_clip; clips stored before
+        # checksums were added have no sha256 to compare
+        if expected_sha256 is not None and digest.digest() != bytes(expected_sha256):
+            os.unlink(temp_file.name)
+            logger.error(f"❌ Checksum mismatch for clip {clip_id}, discarding corrupted data")
+            return None
+        
+        logger.info(f"✅ Retrieved clip {clip_id} from {gcs_uri or 'buffer'}")
         return temp_file.name
         
     except Exception as e:
         logger.error(f"❌ Error retrieving clip from buffer: {e}")
         return None
+    finally:
+        if conn is not None:
+            release_db_connection(conn)
+
+def is_allowed_clip_url(url) -> bool:
+    """True for https URLs on one of CLIP_URL_HOSTS"""
+    if not isinstance(url, str):
+        return False
+    try:
+        parts = urlsplit(url)
+        return parts.scheme == 'https' and parts.hostname in CLIP_URL_HOSTS and parts.port in (None, 443)
+    except ValueError:  # Malformed URL, e.g. a non-numeric port
+        return False
+
+def download_clip_from_url(clip: dict) -> str:
+    """
+    Download a clip straight from its source (e.g. a Pexels file URL) to a temp file,
+    skipping the CockroachDB buffer round-trip
+    
+    Args:
+        clip: {"url": "https://...", "type": "video" | "photo"}
+        
+    Returns:
+        Path to temp file, or None if failed
+    """
+    url = clip.get('url', '')
+    if not is_allowed_clip_url(url):
+        logger.error(f"❌ Refusing clip URL outside Pexels media hosts: {url[:80]}")
+        return None
+    
+    suffix = '.mp4' if clip.get('type', 'video') == 'video' else '.jpg'
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with temp_file, http_session.get(url, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            bytes_written = 0
+            for chunk in response.iter_content(chunk_size=URL_CLIP_CHUNK_SIZE):
+                bytes_written += len(chunk)
+                if bytes_written > MAX_CLIP_BYTES:
+                    raise ValueError(f"clip larger than {MAX_CLIP_BYTES // (1024 * 1024)} MB")
+                temp_file.write(chunk)
+        
+        logger.info(f"✅ Downloaded clip from source: {bytes_written / (1024 * 1024):.2f} MB")
+        return temp_file.name
+        
+    except Exception as e:
+        logger.error(f"❌ Error downloading clip from {url[:80]}: {e}")
+        os.unlink(temp_file.name)
+        return None
 
 @app.route('/', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({'status': 'healthy', 'service': 'video-processor'}), 200
 
+def _run_ffmpeg(args):
+    """Run ffmpeg with the given arguments and return its stderr log (raises on failure)"""
+    result = subprocess.run(
+        [FFMPEG_BINARY, '-y', '-hide_banner'] + args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    log = result.stderr.decode('utf-8', errors='replace')
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {log[-500:]}")
+    return log
+
+def _portrait_filter(target_width, target_height):
+    """ffmpeg filter graph: center-crop to the target ratio and scale, in one pass"""
+    return (
+        f"crop=w='min(iw,ih*{target_width}/{target_height})':h='min(ih,iw*{target_height}/{target_width})',"
+        f"scale={target_width}:{target_height}:flags=lanczos,setsar=1,fps=30,format=yuv420p"
+    )
+
+def _fetch_and_normalize_clip(i, clip, target_width, target_height):
+    """
+    Retrieve one clip (a buffer clip ID, or a {"url", "type"} dict downloaded directly)
+    and encode it as a portrait segment with ffmpeg
+    
+    Every segment gets the same size, frame rate, pixel format and codec settings so the
+    segments can be joined with the concat demuxer without re-encoding.
+    
+    Returns:
+        (temp file path or None, segment path or None, segment duration)
+    """
+    clip_path = None
+    segment_path = None
+    try:
+        if isinstance(clip, dict):
+            # Source URL - fetched directly, never stored in the buffer
+            logger.info(f"📥 Downloading clip {i+1} from source...")
+            clip_path = download_clip_from_url(clip)
+        else:
+            # Retrieve clip from CockroachDB buffer
+            logger.info(f"📥 Retrieving clip {i+1} from buffer (ID: {clip})...")
+            clip_path = retrieve_clip_from_buffer(clip)
+        
+        if not clip_path:
+            logger.warning(f"⚠️ Failed to retrieve clip {i+1}")
+            return None, None, 0.0
+        
+        # Determine media type from file extension
+        media_type = 'video' if clip_path.endswith('.mp4') else 'photo'
+        
+        segment_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+        codec, preset, threads, codec_params = pick_encoder(target_width, target_height, 5.0)
+        if media_type == 'photo' and codec == 'libx264':
+            # Static frame: stillimage tuning only changes deblock/psy/AQ, so the segment
+            # keeps the same SPS/PPS as video segments and still concatenates with -c copy
+            codec_params = codec_params + ['-tune', 'stillimage']
+        encode_args = [
+            '-vf', _portrait_filter(target_width, target_height),
+            '-an',
+            '-c:v', codec, '-preset', preset, '-threads', str(threads),
+            *codec_params,
+            segment_path
+        ]
+        
+        if media_type == 'video':
+            # Trim to reasonable duration (max 5s per clip to reduce memory)
+            log = _run_ffmpeg(['-i', clip_path, '-t', '5'] + encode_args)
+            match = FFMPEG_DURATION_RE.search(log)
+            source_duration = (
+                int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+                if match else 5.0
+            )
+            video_duration = min(source_duration, 5.0)
+            logger.info(f"✅ Processed video clip {i+1}: {video_duration:.1f}s")
+            return clip_path, segment_path, video_duration
+        
+        # Photos are shown for 3 seconds
+        _run_ffmpeg(['-loop', '1', '-i', clip_path, '-t', '3'] + encode_args)
+        logger.info(f"✅ Processed photo clip {i+1}: 3.0s")
+        return clip_path, segment_path, 3.0
+        
+    except Exception as e:
+        logger.error(f"❌ Error processing clip {i+1}: {e}")
+        if segment_path:
+            try:
+                os.unlink(segment_path)
+            except:
+                pass
+        return clip_path, None, 0.0
+
 @app.route('/process-clips', methods=['POST'])
 def process_clips():
     """
     Process video clips from CockroachDB buffer: retrieve, resize, concatenate
     
     NEW ARCHITECTURE: Clips are pre-downloaded to buffer by Render
+    Clips are cropped/scaled and joined by ffmpeg directly (no MoviePy frame loop);
+    the output is video only - source clip audio is dropped
     
     Request JSON:
     {
@@ -162,106 +482,65 @@ def process_clips():
         
         logger.info(f"🎬 Processing {len(clip_ids)} clips from buffer...")
         
-        # Process clips
-        clips = []
-        temp_files = []
-        
-        for i, clip_id in enumerate(clip_ids):
-            try:
-                # Retrieve clip from CockroachDB buffer
-                logger.info(f"📥 Retrieving clip {i+1} from buffer (ID: {clip_id})...")
-                
-                clip_path = retrieve_clip_from_buffer(clip_id)
-                
-                if not clip_path:
-                    logger.warning(f"⚠️ Failed to retrieve clip {i+1} from buffer")
-                    continue
-                
-                temp_files.append(clip_path)
-                
-                # Determine media type from file extension
-                media_type = 'video' if clip_path.endswith('.mp4') else 'photo'
-                
-                # Process clip
-                if media_type == 'video':
-                    video_clip = VideoFileClip(clip_path)
-                    
-                    # Trim to reasonable duration (max 5s per clip to reduce memory)
-                    video_duration = min(video_clip.duration, 5.0)
-                    video_clip = video_clip.subclip(0, video_duration)
-                    
-                    # Resize to portrait
-                    video_clip = resize_to_portrait(video_clip, target_width, target_height)
-                    
-                    clips.append(video_clip)
-                    logger.info(f"✅ Processed video clip {i+1}: {video_duration:.1f}s")
-                
-                else:  # photo
-                    # Photos should have duration metadata from buffer
-                    img_clip = ImageClip(clip_path, duration=3.0)
-                    img_clip = resize_to_portrait(img_clip, target_width, target_height)
-                    clips.append(img_clip)
-                    logger.info(f"✅ Processed photo clip {i+1}: 3.0s")
-                
-            except Exception as e:
-                logger.error(f"❌ Error processing clip {i+1}: {e}")
-                continue
-            
-            # Force garbage collection after each clip
-            gc.collect()
-        
-        if not clips:
-            return jsonify({'error': 'No clips processed successfully'}), 500
+        # Process clips - retrieval is network bound and each encode is its own ffmpeg process,
+        # so run them in parallel (bounded to keep memory in check); executor.map preserves order
+        with ThreadPoolExecutor(max_workers=min(MAX_CLIP_WORKERS, len(clip_ids))) as executor:
+            results = list(executor.map(
+                lambda args: _fetch_and_normalize_clip(*args, target_width, target_height),
+                enumerate(clip_ids)
+            ))
         
-        # Concatenate clips
-        logger.info(f"🎬 Concatenating {len(clips)} clips...")
-        final_video = concatenate_videoclips(clips, method="compose")
+        temp_files = [path for result in results for path in result[:2] if path]
+        segments = [(segment_path, duration) for _, segment_path, duration in results if segment_path]
         
-        # Clean up temp files immediately after concatenation
-        for temp_file in temp_files:
-            try:
-                os.unlink(temp_file)
-            except:
-                pass
-        
-        # Write to temp file
         output_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
         output_path = output_file.name
         output_file.close()
         
-        logger.info("💾 Writing final video...")
-        final_video.write_videofile(
-            output_path,
-            codec='libx264',
-            audio_codec='aac',
-            fps=30,
-            preset='medium',
-            threads=4,
-            logger=None
-        )
-        
-        # Get file size
-        file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
-        logger.info(f"📊 Processed video size: {file_size_mb:.2f} MB")
+        list_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt')
+        temp_files.append(list_file.name)
         
-        # Store in CockroachDB with chunking if needed
-        logger.info("☁️ Storing in CockroachDB...")
-        video_id = store_in_cockroachdb(output_path, final_video.duration, file_size_mb)
-        
-        # Clean up
-        for clip in clips:
-            clip.close()
-        final_video.close()
-        os.unlink(output_path)
-        gc.collect()
+        try:
+            if not segments:
+                return jsonify({'error': 'No clips processed successfully'}), 500
+            
+            # Concatenate segments - they share encoding settings, so just copy the streams
+            logger.info(f"🎬 Concatenating {len(segments)} clips...")
+            for segment_path, _ in segments:
+                list_file.write(f"file '{segment_path}'\n")
+            list_file.close()
+            
+            _run_ffmpeg([
+                '-f', 'concat', '-safe', '0', '-i', list_file.name,
+                '-c', 'copy', '-movflags', '+faststart',
+                output_path
+            ])
+            duration = sum(duration for _, duration in segments)
+            
+            # Get file size
+            file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+            logger.info(f"📊 Processed video size: {file_size_mb:.2f} MB")
+            
+            # Store in CockroachDB with chunking if needed
+            logger.info("☁️ Storing in CockroachDB...")
+            video_id = store_in_cockroachdb(output_path, duration, file_size_mb)
+        
+        finally:
+            # Clean up
+            list_file.close()
+            for temp_file in temp_files + [output_path]:
+                try:
+                    os.unlink(temp_file)
+                except:
+                    pass
         
         logger.info(f"✅ Video processed and stored in CockroachDB: {video_id}")
         
         return jsonify({
             'video_id': video_id,
-            'duration': final_video.duration,
+            'duration': duration,
             'size_mb': file_size_mb,
-            'clips_processed': len(clips)
+            'clips_processed': len(segments)
         }), 200
         
     except Exception as e:
@@ -270,18 +549,18 @@ def process_clips():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-def store_in_cockroachdb(video_path, duration, file_size_mb):
-    """Store processed video in CockroachDB with chunking support"""
-    try:
-        conn = get_db_connection()
+def _ensure_schema(conn):
+    """
+    Create processed_videos tables (and the newer temp_clips columns read by
+    retrieve_clip_from_buffer) once per process; DDL is skipped on later calls
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
         cursor = conn.cursor()
-        
-        # Read video file
-        with open(video_path, 'rb') as f:
-            video_data = f.read()
-        
-        chunk_size = 6 * 1024 * 1024  # 6 MB chunks (same as buffer system)
-        
         logger.info("📋 Ensuring tables exist...")
         # Create processed_videos table if not exists
         cursor.execute("""
@@ -306,13 +585,32 @@ def store_in_cockroachdb(video_path, duration, file_size_mb):
                 UNIQUE(video_id, chunk_number)
             )
         """)
+        
+        # Added by CockroachBufferStorage too; repeated here in case that side hasn't run yet
+        # (Cloud Run is deployed before Render)
+        cursor.execute("ALTER TABLE IF EXISTS temp_clips ADD COLUMN IF NOT EXISTS source_url_hash BYTEA")
+        cursor.execute("ALTER TABLE IF EXISTS temp_clips ADD COLUMN IF NOT EXISTS sha256 BYTEA")
+        cursor.execute("ALTER TABLE IF EXISTS temp_clips ADD COLUMN IF NOT EXISTS gcs_uri TEXT")
         conn.commit()
+        cursor.close()
         logger.info("✅ Tables ready")
+        _schema_ready = True
+
+def store_in_cockroachdb(video_path, duration, file_size_mb):
+    """Store processed video in CockroachDB with chunking support"""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        
+        chunk_size = 6 * 1024 * 1024  # 6 MB chunks (same as buffer system)
+        
+        _ensure_schema(conn)
         
         # Check if chunking needed
         if file_size_mb > 8:
             # Use chunking
-            total_chunks = (len(video_data) + chunk_size - 1) // chunk_size
+            total_chunks = (os.path.getsize(video_path) + chunk_size - 1) // chunk_size
             
             logger.info(f"💾 Chunking {file_size_mb:.2f} MB video into {total_chunks} chunks...")
             
@@ -322,80 +620,83 @@ def store_in_cockroachdb(video_path, duration, file_size_mb):
             cursor.execute("""
                 INSERT INTO processed_videos (id, video_data, duration, file_size_mb, is_chunked, total_chunks)
                 VALUES (%s, %s, %s, %s, %s, %s)
-            """, (video_id, psycopg2.Binary(b''), Decimal(str(duration)), Decimal(str(file_size_mb)), True, total_chunks))
-            conn.commit()
+            """, (video_id, psycopg2.Binary(b''), float(duration), float(file_size_mb), True, total_chunks))
             
-            # Store chunks
-            for i in range(total_chunks):
-                start = i * chunk_size
-                end = min(start + chunk_size, len(video_data))
-                chunk = video_data[start:end]
-                
-                cursor.execute("""
-                    INSERT INTO processed_video_chunks (video_id, chunk_number, chunk_data)
-                    VALUES (%s, %s, %s)
-                """, (video_id, i, psycopg2.Binary(chunk)))
-                conn.commit()
-                
-                logger.info(f"   💾 Stored chunk {i+1}/{total_chunks}")
+            # Stream chunks straight from the file with binary COPY - one chunk in memory at a time,
+            # no hex escaping, and a single commit for the metadata row and all chunks
+            with open(video_path, 'rb') as f:
+                cursor.copy_expert(
+                    "COPY processed_video_chunks (video_id, chunk_number, chunk_data) FROM STDIN WITH BINARY",
+                    ChunkCopyStream(video_id, iter(functools.partial(f.read, chunk_size), b'')),
+                    size=chunk_size
+                )
+            conn.commit()
             
             logger.info(f"💾 Stored video in CockroachDB (CHUNKED): {file_size_mb:.2f} MB in {total_chunks} chunks")
         else:
-            # Store directly
+            # Store directly - psycopg2 escapes straight from the mapped file pages,
+            # so no Python-side copy of the video is made
             video_id = str(uuid.uuid4())
             
-            cursor.execute("""
-                INSERT INTO processed_videos (id, video_data, duration, file_size_mb, is_chunked, total_chunks)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (video_id, psycopg2.Binary(video_data), Decimal(str(duration)), Decimal(str(file_size_mb)), False, 1))
+            with open(video_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                    memoryview(mm) as video_data:
+                cursor.execute("""
+                    INSERT INTO processed_videos (id, video_data, duration, file_size_mb, is_chunked, total_chunks)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (video_id, psycopg2.Binary(video_data), float(duration), float(file_size_mb), False, 1))
             
             conn.commit()
             
             logger.info(f"💾 Stored video in CockroachDB: {file_size_mb:.2f} MB")
         
         cursor.close()
-        conn.close()
         
         return video_id
         
     except Exception as e:
-        conn.rollback()
+        if conn is not None:
+            conn.rollback()
         logger.error(f"❌ Failed to store in CockroachDB: {e}")
         raise
-
-def resize_to_portrait(clip, target_width=1080, target_height=1920):
-    """Resize clip to portrait 9:16 ratio"""
-    clip_width, clip_height = clip.size
-    clip_ratio = clip_width / clip_height
-    target_ratio = target_width / target_height
-    
-    if clip_ratio > target_ratio:
-        # Clip is wider - crop width
-        new_width = int(clip_height * target_ratio)
-        x_center = clip_width / 2
-        x1 = int(x_center - new_width / 2)
-        clip = clip.crop(x1=x1, width=new_width)
-    else:
-        # Clip is taller - crop height
-        new_height = int(clip_width / target_ratio)
-        y_center = clip_height / 2
-        y1 = int(y_center - new_height / 2)
-        clip = clip.crop(y1=y1, height=new_height)
-    
-    # Resize to exact target dimensions
-    clip = clip.resize((target_width, target_height))
-    return clip
+    finally:
+        if conn is not None:
+            release_db_connection(conn)
 
 @app.route('/create-complete-reel', methods=['POST'])
 def create_complete_reel():
     """
     COMPLETE reel creation on Cloud Run (4GB RAM)
     Steps: Concatenate clips + NYT image + text overlay + captions + anchor + voice audio
+    Clips come as buffer "clip_ids" and/or "clip_urls" ([{"url": ..., "type": "video"}]),
+    which are downloaded straight from the source
     Returns video_id stored in CockroachDB
     """
+    result, status = build_complete_reel(request.get_json())
+    return jsonify(result), status
+
+def build_complete_reel(data: dict):
+    """
+    Build the complete reel in-process (shared by /create-complete-reel and
+    /generate-reel-from-article)
+    
+    Args:
+        data: Same fields as the /create-complete-reel JSON body
+        
+    Returns:
+        (response dict, HTTP status)
+    """
+    temp_paths = []  # Every temp file created here, removed in finally (early returns included)
     try:
-        data = request.get_json()
-        clip_ids = data.get('clip_ids', [])
+        # Buffer clip IDs first, then clips to download from their source URLs
+        # (URLs outside CLIP_URL_HOSTS are skipped per clip, not fatal for the whole reel)
+        clip_urls = []
+        for clip in data.get('clip_urls', []):
+            if isinstance(clip, dict) and is_allowed_clip_url(clip.get('url')):
+                clip_urls.append(clip)
+            else:
+                logger.warning(f"⚠️ Skipping clip URL outside Pexels media hosts: {str(clip)[:80]}")
+        clip_sources = data.get('clip_ids', []) + clip_urls
         headline = data.get('headline', '')
         commentary = data.get('commentary', '')
         voice_audio_id = data.get('voice_audio_id')
@@ -404,24 +705,25 @@ def create_complete_reel():
         target_height = data.get('target_height', 1920)
         
         logger.info(f"🎬 COMPLETE reel creation on Cloud Run...")
-        logger.info(f"  Clips: {len(clip_ids)}, Voice: {bool(voice_audio_id)}, NYT Image: {bool(nyt_image_url)}")
-        
-        # Import animated_reel_creator to leverage existing logic
-        from animated_reel_creator import AnimatedReelCreator
-        
-        creator = AnimatedReelCreator()
-        
-        # Retrieve clips from buffer
-        clips = []
-        for clip_id in clip_ids:
-            clip_path = retrieve_clip_from_buffer(clip_id)
-            if clip_path:
-                clips.append(clip_path)
+        logger.info(f"  Clips: {len(clip_sources)}, Voice: {bool(voice_audio_id)}, NYT Image: {bool(nyt_image_url)}")
+        
+        # Retrieve clips and crop/scale/trim each in one ffmpeg pass, in parallel;
+        # the voice track is fetched alongside on its own worker
+        with ThreadPoolExecutor(max_workers=max(1, min(MAX_CLIP_WORKERS, len(clip_sources))) + 1) as executor:
+            voice_future = executor.submit(retrieve_clip_from_buffer, voice_audio_id) if voice_audio_id else None
+            results = list(executor.map(
+                lambda args: _fetch_and_normalize_clip(*args, target_width, target_height),
+                enumerate(clip_sources)
+            ))
+        voice_path = voice_future.result() if voice_future else None
+        clips = [clip_path for clip_path, _, _ in results if clip_path]
+        segments = [segment_path for _, segment_path, _ in results if segment_path]
+        temp_paths.extend(clips + segments + ([voice_path] if voice_path else []))
         
         if not clips:
-            return jsonify({'error': 'No clips retrieved'}), 400
+            return {'error': 'No clips retrieved'}, 400
         
-        logger.info(f"✅ Retrieved {len(clips)} clips from buffer")
+        logger.info(f"✅ Retrieved {len(clips)} clips")
         
         # Use AnimatedReelCreator to build complete reel with all features
         logger.info("🎨 Building complete reel with all features...")
@@ -431,45 +733,37 @@ def create_complete_reel():
         
         # Create reel video path
         output_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+        temp_paths.append(output_path)
         
         # Build the reel (simplified version - we'll expand this)
-        from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip, CompositeVideoClip, ImageClip
-        import numpy as np
+        from moviepy.editor import VideoFileClip, concatenate_videoclips, AudioFileClip
         from PIL import Image, ImageDraw, ImageFont
         
         # Load video clips
         video_clips = []
-        for clip_path in clips:
+        for segment_path in segments:
             try:
-                clip = VideoFileClip(clip_path)
-                clip = resize_to_portrait(clip, target_width, target_height)
-                clip = clip.subclip(0, min(5, clip.duration))  # Max 5s per clip
-                video_clips.append(clip)
+                video_clips.append(VideoFileClip(segment_path))
             except Exception as e:
                 logger.warning(f"⚠️ Failed to load clip: {e}")
         
         if not video_clips:
-            return jsonify({'error': 'Failed to load video clips'}), 500
+            return {'error': 'Failed to load video clips'}, 500
         
         # Prepend NYT image if provided (4 seconds)
         if nyt_image_url:
             logger.info("📰 Adding NYT article image as first clip...")
             try:
-                img_response = requests.get(nyt_image_url, timeout=10)
+                img_response = http_session.get(nyt_image_url, timeout=10)
                 img_response.raise_for_status()
                 
-                nyt_img_temp = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg')
-                nyt_img_temp.write(img_response.content)
-                nyt_img_temp.close()
-                
-                # Resize NYT image to portrait
+                # Decode and resize in memory; no temp files or JPEG re-encode
                 from PIL import Image as PILImage
-                img = PILImage.open(nyt_img_temp.name)
-                img_resized = img.resize((target_width, target_height), PILImage.Resampling.LANCZOS)
-                img_resized_path = tempfile.NamedTemporaryFile(delete=False, suffix='.jpg').name
-                img_resized.save(img_resized_path, 'JPEG', quality=85)
+                img = PILImage.open(BytesIO(img_response.content))
+                img.draft('RGB', (target_width, target_height))  # JPEG: decode at reduced scale
+                img_resized = img.convert('RGB').resize((target_width, target_height), PILImage.Resampling.LANCZOS)
                 
-                nyt_clip = ImageClip(img_resized_path, duration=4)
+                nyt_clip = ImageClip(np.asarray(img_resized), duration=4)
                 video_clips.insert(0, nyt_clip)
                 logger.info("✅ NYT image added (4s)")
                 
@@ -478,12 +772,16 @@ def create_complete_reel():
         
         # Concatenate all clips
         logger.info(f"🎞️ Concatenating {len(video_clips)} clips...")
-        final_video = concatenate_videoclips(video_clips, method='compose')
+        # Every clip is resized to the target frame, so streams can be chained directly;
+        # fall back to compose (per-frame compositing) if one somehow isn't
+        same_size = all(tuple(clip.size) == (target_width, target_height) for clip in video_clips)
+        if not same_size:
+            logger.warning("⚠️ Clip sizes differ, using compose concatenation")
+        final_video = concatenate_videoclips(video_clips, method='chain' if same_size else 'compose')
         
         # Add voice audio if provided
         if voice_audio_id:
             logger.info("🎤 Adding voice narration...")
-            voice_path = retrieve_clip_from_buffer(voice_audio_id)
             if voice_path:
                 try:
                     audio_clip = AudioFileClip(voice_path)
@@ -502,13 +800,17 @@ def create_complete_reel():
         
         # Write final video
         logger.info("💾 Writing final video...")
+        codec, preset, threads, codec_params = pick_encoder(target_width, target_height, final_video.duration)
+        if codec == 'libx264':
+            codec_params = codec_params + X264_PIPED_PARAMS
         final_video.write_videofile(
             output_path,
-            codec='libx264',
+            codec=codec,
             audio_codec='aac',
             fps=30,
-            preset='medium',
-            threads=4
+            preset=preset,
+            threads=threads,
+            ffmpeg_params=codec_params + ['-movflags', '+faststart']
         )
         
         duration = final_video.duration
@@ -526,35 +828,65 @@ def create_complete_reel():
         
         logger.info(f"✅ Complete reel created: {duration:.1f}s, {file_size_mb:.2f}MB (ID: {video_id})")
         
-        # Cleanup temp files
-        os.unlink(output_path)
-        for clip_path in clips:
-            try:
-                os.unlink(clip_path)
-            except:
-                pass
-        
-        return jsonify({
+        return {
             'video_id': str(video_id),
             'duration': float(duration),
             'file_size_mb': float(round(file_size_mb, 2))
-        })
+        }, 200
         
     except Exception as e:
         logger.error(f"❌ Error in complete reel creation: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
+    
+    finally:
+        # Cleanup temp files - on a long-lived worker anything left here keeps filling /tmp
+        for temp_path in temp_paths:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+def apply_static_overlay(video_clip, overlay_rgba, x, y):
+    """
+    Alpha-blend a constant RGBA image onto every frame
+    
+    The overlay is premultiplied once; per frame only the covered region is
+    blended, instead of compositing a full-size layer with CompositeVideoClip.
+    
+    Args:
+        video_clip: Clip to draw on
+        overlay_rgba: HxWx4 uint8 array
+        x, y: Top-left position in the frame
+        
+    Returns:
+        New clip with the overlay burned in
+    """
+    frame_w, frame_h = video_clip.size
+    h = min(overlay_rgba.shape[0], frame_h - y)
+    w = min(overlay_rgba.shape[1], frame_w - x)
+    overlay = overlay_rgba[:h, :w]
+    
+    alpha = overlay[..., 3:4].astype(np.float32) / 255.0
+    premultiplied = overlay[..., :3].astype(np.float32) * alpha
+    inverse_alpha = 1.0 - alpha
+    
+    def blend(frame):
+        # Copy: clips may hand back the same cached array every frame
+        frame = frame.copy()
+        region = frame[y:y + h, x:x + w]
+        region[...] = region * inverse_alpha + premultiplied
+        return frame
+    
+    return video_clip.fl_image(blend)
 
 def add_headline_overlay(video_clip, headline, target_width, target_height):
     """Add headline text overlay using PIL"""
     try:
         from PIL import Image as PILImage, ImageDraw, ImageFont
-        import numpy as np
         import textwrap
         
-        duration = video_clip.duration
-        
         # Create image for text
         overlay_height = 200
         img = PILImage.new('RGBA', (target_width, overlay_height), (0, 0, 0, 180))
@@ -567,11 +899,9 @@ def add_headline_overlay(video_clip, headline, target_width, target_height):
         draw.text((target_width//2, overlay_height//2), wrapped, 
                   fill=(255, 255, 255, 255), anchor='mm')
         
-        # Convert to numpy and create clip
+        # Burn in, horizontally centered, 50px from the top
         img_array = np.array(img)
-        text_clip = ImageClip(img_array, duration=duration).set_position(('center', 50))
-        
-        return CompositeVideoClip([video_clip, text_clip])
+        return apply_static_overlay(video_clip, img_array, (video_clip.w - target_width) // 2, 50)
     except Exception as e:
         logger.warning(f"⚠️ Failed to add headline overlay: {e}")
         return video_clip
@@ -580,9 +910,6 @@ def add_anchor_overlay(video_clip, target_width, target_height):
     """Add anchor overlay in corner"""
     try:
         from PIL import Image as PILImage, ImageDraw
-        import numpy as np
-        
-        duration = video_clip.duration
         
         # Create simple anchor overlay (circle with initials)
         size = 100
@@ -595,11 +922,9 @@ def add_anchor_overlay(video_clip, target_width, target_height):
         # Draw initials
         draw.text((size//2, size//2), 'RA', fill=(255, 255, 255, 255), anchor='mm')
         
-        # Convert and position
+        # Burn in at the top-right corner
         img_array = np.array(img)
-        anchor_clip = ImageClip(img_array, duration=duration).set_position((target_width - 120, 20))
-        
-        return CompositeVideoClip([video_clip, anchor_clip])
+        return apply_static_overlay(video_clip, img_array, target_width - 120, 20)
     except Exception as e:
         logger.warning(f"⚠️ Failed to add anchor: {e}")
         return video_clip
@@ -629,8 +954,7 @@ def generate_reel_from_article():
         
         # Step 1: Generate voice narration
         logger.info("🎤 Generating voice narration...")
-        from google_tts_voice import GoogleTTSVoice
-        tts = GoogleTTSVoice()
+        tts = get_tts_voice()
         
         voice_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
         voice_file.close()
@@ -648,25 +972,11 @@ def generate_reel_from_article():
         
         # Step 2: Extract keywords and download Pexels clips
         logger.info(f"📥 Fetching {clips_count} Pexels clips...")
-        from pexels_video_fetcher import PexelsMediaFetcher
-        import uuid
-        
-        pexels = PexelsMediaFetcher()
-        keywords = pexels.extract_search_keywords(headline, commentary)
+        pexels = get_pexels_fetcher()
         
         session_id = str(uuid.uuid4())
-        clip_ids = []
-        
-        for keyword in keywords[:3]:
-            videos = pexels.search_videos(keyword, per_page=3, orientation='portrait')
-            for video in videos:
-                clip_id = pexels.download_media(video['url'], 'video', session_id)
-                if clip_id:
-                    clip_ids.append(clip_id)
-                    if len(clip_ids) >= clips_count:
-                        break
-            if len(clip_ids) >= clips_count:
-                break
+        # Searches run concurrently and each keyword's downloads start as soon as its search returns
+        clip_ids = pexels.fetch_clips_for_article(headline, commentary, session_id, clips_count)
         
         if not clip_ids:
             os.unlink(voice_path)
@@ -677,32 +987,27 @@ def generate_reel_from_article():
         # Step 3: Upload voice to buffer
         with open(voice_path, 'rb') as f:
             voice_data = f.read()
-        voice_id = pexels.buffer.store_clip(voice_data, 'audio', session_id)
+        voice_id = pexels.buffer.store_clip_bytes(voice_data, 'audio', session_id)
         os.unlink(voice_path)
         
         logger.info(f"✅ Voice uploaded to buffer (ID: {voice_id})")
         
-        # Step 4: Call complete reel creation endpoint
+        # Step 4: Build complete reel in-process
         logger.info("🎨 Creating complete reel with all features...")
         
-        response = requests.post(
-            'http://localhost:8080/create-complete-reel',
-            json={
-                'clip_ids': clip_ids,
-                'headline': headline,
-                'commentary': commentary,
-                'voice_audio_id': voice_id,
-                'nyt_image_url': nyt_image_url,
-                'target_width': 1080,
-                'target_height': 1920
-            },
-            timeout=600
-        )
+        result, status = build_complete_reel({
+            'clip_ids': clip_ids,
+            'headline': headline,
+            'commentary': commentary,
+            'voice_audio_id': voice_id,
+            'nyt_image_url': nyt_image_url,
+            'target_width': 1080,
+            'target_height': 1920
+        })
         
-        if response.status_code != 200:
-            return jsonify({'error': 'Reel creation failed', 'details': response.text}), 500
+        if status != 200:
+            return jsonify({'error': 'Reel creation failed', 'details': result.get('error')}), 500
         
-        result = response.json()
         video_id = result['video_id']
         duration = result['duration']
         file_size_mb = result['file_size_mb']
@@ -713,59 +1018,46 @@ def generate_reel_from_article():
         logger.info("💾 Saving reel to 'reels' table for auto-posting...")
         
         conn = get_db_connection()
-        cursor = conn.cursor()
         
         try:
-            # Retrieve video from processed_videos
-            cursor.execute("""
-                SELECT video_data, is_chunked, total_chunks
-                FROM processed_videos
-                WHERE id = %s
-            """, (video_id,))
+            cursor = conn.cursor()
             
-            row = cursor.fetchone()
-            if not row:
-                return jsonify({'error': 'Video not found in buffer'}), 500
-            
-            video_data_chunk, is_chunked, total_chunks = row
-            
-            # If chunked, retrieve all chunks
-            if is_chunked and total_chunks > 1:
-                logger.info(f"📦 Retrieving {total_chunks} chunks...")
-                cursor.execute("""
-                    SELECT chunk_data 
-                    FROM processed_video_chunks
-                    WHERE video_id = %s
-                    ORDER BY chunk_number
-                """, (video_id,))
-                
-                chunks = cursor.fetchall()
-                video_data = b''.join([bytes(chunk[0]) for chunk in chunks])
-            else:
-                video_data = bytes(video_data_chunk)
-            
-            logger.info(f"✅ Retrieved video: {len(video_data) / (1024*1024):.2f} MB")
-            
-            # Insert into reels table
+            # Copy the video into reels server-side - chunks are reassembled by the
+            # database, so the reel never passes through this process's memory
             cursor.execute("""
                 INSERT INTO reels (
                     headline, caption, video_data, duration,
                     article_url, article_id, status, created_at, file_size, ai_analysis
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s)
+                )
+                SELECT %s, %s,
+                    CASE WHEN v.is_chunked THEN (
+                        SELECT string_agg(c.chunk_data, ''::BYTES ORDER BY c.chunk_number)
+                        FROM processed_video_chunks c
+                        WHERE c.video_id = v.id
+                    ) ELSE v.video_data END,
+                    %s, %s, %s, %s, NOW(), %s, %s
+                FROM processed_videos v
+                WHERE v.id = %s
                 RETURNING id
             """, (
                 headline,
                 commentary,  # Use commentary as caption
-                psycopg2.Binary(video_data),
-                Decimal(str(duration)),
+                float(duration),
                 article_url,
                 article_id,
                 'pending',
-                Decimal(str(file_size_mb)),
-                commentary  # Use commentary as ai_analysis (this is the actual TTS narration)
+                float(file_size_mb),
+                commentary,  # Use commentary as ai_analysis (this is the actual TTS narration)
+                video_id
             ))
             
-            reel_id = cursor.fetchone()[0]
+            row = cursor.fetchone()
+            if not row:
+                conn.rollback()
+                cursor.close()
+                return jsonify({'error': 'Video not found in buffer'}), 500
+            
+            reel_id = row[0]
             conn.commit()
             
             logger.info(f"✅ Reel saved to 'reels' table: {reel_id}")
@@ -778,7 +1070,6 @@ def generate_reel_from_article():
             logger.info("🧹 Cleaned up buffer storage")
             
             cursor.close()
-            conn.close()
             
             return jsonify({
                 'reel_id': str(reel_id),
@@ -791,6 +1082,8 @@ def generate_reel_from_article():
             conn.rollback()
             logger.error(f"❌ Database error: {e}")
             raise
+        finally:
+            release_db_connection(conn)
         
     except Exception as e:
         logger.error(f"❌ Error in article reel generation: {e}")
@@ -5,13 +5,28 @@ Uses CockroachDB buffer to avoid storing large files on Render
 """
 
 import os
+import re
+import hashlib
 import requests
-import tempfile
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import logging
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from groq import Groq
-from cockroach_buffer import CockroachBufferStorage
+from cockroach_buffer import CockroachBufferStorage, MAX_CLIP_BYTES
+
+# orjson parses the Pexels search JSON several times faster; fall back to requests' json
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 # Load environment variables from parent directory
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
@@ -24,6 +39,71 @@ PEXELS_VIDEO_API = "https://api.pexels.com/videos/search"
 PEXELS_PHOTO_API = "https://api.pexels.com/v1/search"
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
 
+# Concurrent searches/downloads per batch (network-bound; kept small to be polite to Pexels)
+MAX_SEARCH_WORKERS = 5
+MAX_DOWNLOAD_WORKERS = 5
+GROQ_KEYWORD_TIMEOUT = 5  # seconds to wait for AI keywords before going with the prefetched fallback
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # 1 MiB reads: a 10 MB clip is ~10 loop iterations instead of ~1,300
+USER_AGENT = 'animatedreel/1.0 (+https://github.com/snapthinktrader/animatedreel)'
+
+class _TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ttl seconds (values are lists)"""
+    
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return a copy of the cached list for key, or None if missing/expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return list(value)
+    
+    def put(self, key, value):
+        """Cache a non-empty list, evicting the least recently used entry when full"""
+        if not value:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, list(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# Process-wide caches: news topics (and retried articles) repeat a lot between reels
+_search_cache = _TTLCache(ttl=3600, max_entries=512)  # (kind, query, per_page, orientation) -> results
+_keyword_cache = _TTLCache(ttl=7 * 24 * 3600, max_entries=256)  # blake2b(headline, commentary) -> AI search terms
+
+
+# Stop words and tokenizer for the basic (non-AI) keyword fallback
+_COMMON_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
+    'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
+    'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these',
+    'those', 'it', 'its', "it's", 'what', 'which', 'who', 'when', 'where',
+    'why', 'how', 'about', 'into', 'through', 'during', 'before', 'after',
+    'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once'
+})
+_KEYWORD_SPLIT_RE = re.compile(r'[,.!?\s]+')
+
+
+def _video_file_rank(vf: Dict):
+    """Ranking key for Pexels video files: closest to 9:16 first, then smallest resolution"""
+    return (
+        abs((vf.get('width', 0) / max(vf.get('height', 1), 1)) - 0.5625),  # Prefer 9:16 ratio
+        vf.get('width', 9999) * vf.get('height', 9999)  # Prefer smaller resolution
+    )
+
+
 class PexelsMediaFetcher:
     """Fetch videos and photos from Pexels API"""
     
@@ -31,13 +111,28 @@ class PexelsMediaFetcher:
         """Initialize Pexels fetcher with API key and buffer storage"""
         self.api_key = PEXELS_API_KEY
         self.groq_client = Groq(api_key=os.getenv('GROQ_API_KEY'))
-        self.buffer = CockroachBufferStorage()  # Initialize buffer storage
+        self.buffer = CockroachBufferStorage.get_default()  # Shared buffer storage connection
         
         # Set up headers for API requests
         self.headers = {
-            'Authorization': self.api_key
+            'Authorization': self.api_key,
+            'User-Agent': USER_AGENT
         }
         
+        # Keep-alive session shared by searches and downloads (thread-safe for GETs);
+        # pool sized for the batch workers, retries honour Retry-After on 429
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(
+            pool_connections=10,
+            pool_maxsize=20,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(429, 500, 502, 503, 504),
+                raise_on_status=False
+            )
+        ))
+        
         if not self.api_key:
             logger.warning("⚠️ PEXEL API key not found in environment variables")
         
@@ -56,17 +151,22 @@ class PexelsMediaFetcher:
         Returns:
             List of video dictionaries with download URLs
         """
+        cache_key = ('video', query, per_page, orientation)
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Pexels video search cache HIT: '{query}'")
+            return cached
+        
         try:
-            logger.info(f"🔍 Searching Pexels for videos: '{query}'")
+            logger.info(f"🔍 Searching Pexels for videos: '{query}' (cache MISS)")
             
             params = {
                 'query': query,
                 'per_page': per_page,
-                'orientation': orientation,
-                'size': 'medium'  # medium quality for faster downloads
+                'orientation': orientation
             }
             
-            response = requests.get(
+            response = self.session.get(
                 PEXELS_VIDEO_API,
                 headers=self.headers,
                 params=params,
@@ -79,7 +179,7 @@ class PexelsMediaFetcher:
                 logger.error(f"Headers sent: {self.headers}")
                 return []
             
-            data = response.json()
+            data = orjson.loads(response.content) if HAS_ORJSON else response.json()
             videos = data.get('videos', [])
             
             if not videos:
@@ -94,28 +194,15 @@ class PexelsMediaFetcher:
                 video_files = video.get('video_files', [])
                 
                 # MEMORY OPTIMIZATION: Prefer SMALLER video files for 512 MB RAM
-                # Sort by file size (prefer SD quality over HD/4K)
-                video_files_sorted = sorted(
-                    video_files,
-                    key=lambda vf: (
-                        abs((vf.get('width', 0) / max(vf.get('height', 1), 1)) - 0.5625),  # Prefer 9:16 ratio
-                        vf.get('width', 9999) * vf.get('height', 9999)  # Prefer smaller resolution
-                    )
-                )
-                
-                # Find portrait/vertical video (9:16 ratio preferred for reels)
-                portrait_video = None
-                for vf in video_files_sorted:
-                    width = vf.get('width', 0)
-                    height = vf.get('height', 1)
-                    # Prefer SD or low-HD (smaller files)
-                    if width < vf.get('height', 1) and width <= 720:  # Max 720p width
-                        portrait_video = vf
-                        break
+                # Find portrait/vertical video (9:16 ratio preferred for reels),
+                # SD or low-HD only (max 720p width) for smaller files
+                portrait_files = [
+                    vf for vf in video_files
+                    if vf.get('width', 0) < vf.get('height', 1) and vf.get('width', 0) <= 720
+                ]
                 
-                # Fallback to smallest available video
-                if not portrait_video and video_files_sorted:
-                    portrait_video = video_files_sorted[0]
+                # Single min() pass instead of sorting; fallback to best of all files
+                portrait_video = min(portrait_files or video_files, key=_video_file_rank, default=None)
                 
                 if portrait_video:
                     video_list.append({
@@ -128,6 +215,7 @@ class PexelsMediaFetcher:
                         'quality': portrait_video.get('quality')
                     })
             
+            _search_cache.put(cache_key, video_list)
             return video_list
             
         except Exception as e:
@@ -146,8 +234,14 @@ class PexelsMediaFetcher:
         Returns:
             List of photo dictionaries with URLs
         """
+        cache_key = ('photo', query, per_page, orientation)
+        cached = _search_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ Pexels photo search cache HIT: '{query}'")
+            return cached
+        
         try:
-            logger.info(f"🔍 Searching Pexels for photos: '{query}'")
+            logger.info(f"🔍 Searching Pexels for photos: '{query}' (cache MISS)")
             
             params = {
                 'query': query,
@@ -155,7 +249,7 @@ class PexelsMediaFetcher:
                 'orientation': orientation
             }
             
-            response = requests.get(
+            response = self.session.get(
                 PEXELS_PHOTO_API,
                 headers=self.headers,
                 params=params,
@@ -166,7 +260,7 @@ class PexelsMediaFetcher:
                 logger.error(f"❌ Pexels API error: {response.status_code}")
                 return []
             
-            data = response.json()
+            data = orjson.loads(response.content) if HAS_ORJSON else response.json()
             photos = data.get('photos', [])
             
             if not photos:
@@ -188,12 +282,39 @@ class PexelsMediaFetcher:
                     'height': photo.get('height')
                 })
             
+            _search_cache.put(cache_key, photo_list)
             return photo_list
             
         except Exception as e:
             logger.error(f"❌ Error searching Pexels photos: {e}")
             return []
     
+    def search_videos_batch(self, queries: List[str], per_page: int = 5, orientation: str = 'portrait') -> List[List[Dict]]:
+        """
+        Search Pexels videos for several queries concurrently
+        
+        Returns:
+            One search_videos() result list per query, in query order
+        """
+        return self._search_batch(self.search_videos, queries, per_page, orientation)
+    
+    def search_photos_batch(self, queries: List[str], per_page: int = 5, orientation: str = 'portrait') -> List[List[Dict]]:
+        """
+        Search Pexels photos for several queries concurrently
+        
+        Returns:
+            One search_photos() result list per query, in query order
+        """
+        return self._search_batch(self.search_photos, queries, per_page, orientation)
+    
+    def _search_batch(self, search, queries: List[str], per_page: int, orientation: str) -> List[List[Dict]]:
+        """Run one search call per query on a thread pool (requests releases the GIL while waiting)"""
+        if not queries:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(MAX_SEARCH_WORKERS, len(queries))) as executor:
+            return list(executor.map(lambda query: search(query, per_page, orientation), queries))
+    
     def download_media(self, url: str, media_type: str = 'video', session_id: str = None) -> Optional[str]:
         """
         Download video or photo from Pexels and store in CockroachDB buffer
@@ -206,60 +327,177 @@ class PexelsMediaFetcher:
         Returns:
             Clip ID (UUID) from buffer storage, or None if failed
         """
+        session_id = session_id or 'default'
+        
         try:
+            # Same URL already buffered for this session (e.g. a video matched two keywords)?
+            url_hash = hashlib.blake2b(url.encode(), digest_size=16).digest()
+            existing_id = self.buffer.find_clip_by_hash(url_hash, session_id)
+            if existing_id:
+                logger.info(f"♻️ Reusing buffered {media_type} for same URL (ID: {existing_id})")
+                return existing_id
+            
             logger.info(f"📥 Downloading {media_type} from Pexels...")
             
-            response = requests.get(url, timeout=30, stream=True)
+            if media_type == 'video':
+                data = self._download_video(url)
+            else:
+                data = self._download_photo(url)
             
-            if response.status_code != 200:
-                logger.error(f"❌ Download failed: {response.status_code}")
+            if data is None:
                 return None
             
-            # Check file size before downloading
-            content_length = response.headers.get('content-length')
-            if content_length:
-                size_mb = int(content_length) / (1024 * 1024)
-                logger.info(f"📊 File size: {size_mb:.2f} MB")
-                
-                # CRITICAL: Skip large files to prevent memory issues on 512 MB RAM
-                if size_mb > 10:
-                    logger.warning(f"⚠️ Skipping large file ({size_mb:.2f} MB) to prevent memory issues")
-                    return None
-            
-            # Save to temp file first
-            suffix = '.mp4' if media_type == 'video' else '.jpg'
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            
-            # Download in chunks
-            downloaded = 0
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    temp_file.write(chunk)
-                    downloaded += len(chunk)
-            
-            temp_file.close()
-            
-            file_size_mb = os.path.getsize(temp_file.name) / (1024 * 1024)
+            file_size_mb = len(data) / (1024 * 1024)
             logger.info(f"✅ Downloaded {media_type}: {file_size_mb:.2f} MB")
             
-            # Store in CockroachDB buffer and delete local file
-            clip_id = self.buffer.store_clip(temp_file.name, media_type, session_id or 'default')
+            # Store in CockroachDB buffer
+            clip_id = self.buffer.store_clip_bytes(data, media_type, session_id, url_hash)
             
             if clip_id:
-                logger.info(f"💾 Clip stored in buffer (ID: {clip_id}), local file deleted")
+                logger.info(f"💾 Clip stored in buffer (ID: {clip_id})")
                 return clip_id
             else:
-                logger.error(f"❌ Failed to store in buffer, deleting local file")
-                try:
-                    os.unlink(temp_file.name)
-                except:
-                    pass
+                logger.error(f"❌ Failed to store in buffer")
                 return None
             
         except Exception as e:
             logger.error(f"❌ Error downloading media: {e}")
             return None
     
+    def _download_video(self, url: str):
+        """Stream a video into memory with the size cap enforced; returns a memoryview or None"""
+        response = self.session.get(url, timeout=30, stream=True)
+        
+        if response.status_code != 200:
+            logger.error(f"❌ Download failed: {response.status_code}")
+            response.close()
+            return None
+        
+        # Check file size before downloading
+        content_length = response.headers.get('content-length')
+        if content_length:
+            size_mb = int(content_length) / (1024 * 1024)
+            logger.info(f"📊 File size: {size_mb:.2f} MB")
+            
+            # CRITICAL: Skip large files to prevent memory issues on 512 MB RAM
+            if int(content_length) > MAX_CLIP_BYTES:
+                logger.warning(f"⚠️ Skipping large file ({size_mb:.2f} MB) to prevent memory issues")
+                response.close()
+                return None
+        
+        # Download in chunks straight into memory (files are capped above),
+        # skipping the temp file write + read-back before the buffer insert
+        data = BytesIO()
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            data.write(chunk)
+            # Same cap mid-stream, for responses without (or with a wrong) content-length
+            if data.tell() > MAX_CLIP_BYTES:
+                logger.warning(f"⚠️ Aborting download over {MAX_CLIP_BYTES // (1024 * 1024)} MB to prevent memory issues")
+                response.close()
+                return None
+        
+        return data.getbuffer()
+    
+    def _download_photo(self, url: str) -> Optional[bytes]:
+        """Fetch a photo in one read (a few hundred KB, so streaming buys nothing); returns bytes or None"""
+        response = self.session.get(url, timeout=15)
+        
+        if response.status_code != 200:
+            logger.error(f"❌ Download failed: {response.status_code}")
+            return None
+        
+        if len(response.content) > MAX_CLIP_BYTES:
+            logger.warning(f"⚠️ Skipping large photo ({len(response.content) / (1024 * 1024):.2f} MB)")
+            return None
+        
+        return response.content
+    
+    def download_media_batch(self, items: List[Dict], session_id: str = None) -> List[Optional[str]]:
+        """
+        Download several media files concurrently and store them in the buffer
+        
+        Args:
+            items: Dicts with 'url' and optional 'type' ('video' by default), e.g. search_videos() results
+            session_id: Session ID for grouping clips
+            
+        Returns:
+            Clip IDs in the same order as items (None where a download failed);
+            a URL listed more than once is downloaded once and gets the same ID each time
+        """
+        if not items:
+            return []
+        
+        unique_items = {item['url']: item for item in items}
+        with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(unique_items))) as executor:
+            clip_ids = dict(zip(unique_items, executor.map(
+                lambda item: self.download_media(item['url'], item.get('type', 'video'), session_id),
+                unique_items.values()
+            )))
+        return [clip_ids[item['url']] for item in items]
+    
+    def fetch_clips_for_article(self, headline: str, commentary: str, session_id: str,
+                                clips_count: int = 5, keyword_count: int = 3, per_page: int = 3) -> List[str]:
+        """
+        Extract keywords, search Pexels and download clips to the buffer as one pipeline
+        
+        Searches for all keywords run concurrently, and each keyword's downloads start as
+        soon as its own search returns, so downloads overlap the slower searches. If Groq
+        takes longer than GROQ_KEYWORD_TIMEOUT, the basic fallback keywords are searched
+        instead (only then, so each reel spends one search per keyword of Pexels quota).
+        
+        Args:
+            headline: Article headline
+            commentary: AI-generated commentary
+            session_id: Session ID for grouping clips
+            clips_count: Maximum number of clips to download
+            keyword_count: Number of extracted keywords to search
+            per_page: Search results per keyword
+            
+        Returns:
+            Buffer clip IDs of the successful downloads, in keyword/result order
+        """
+        if clips_count <= 0:
+            return []
+        
+        # Ask Groq in the background; its thread is not joined, so a slow call can't hold us up
+        groq_executor = ThreadPoolExecutor(max_workers=1)
+        keywords_future = groq_executor.submit(self.extract_search_keywords, headline, commentary)
+        groq_executor.shutdown(wait=False)
+        
+        with ThreadPoolExecutor(max_workers=MAX_SEARCH_WORKERS) as search_executor, \
+                ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, clips_count)) as download_executor:
+            try:
+                keywords = keywords_future.result(timeout=GROQ_KEYWORD_TIMEOUT)[:keyword_count]
+            except FuturesTimeoutError:
+                logger.warning(f"⚠️ Groq keyword extraction took over {GROQ_KEYWORD_TIMEOUT}s, using fallback keywords")
+                keywords = self._basic_keyword_extraction(headline, commentary)[:keyword_count]
+            
+            search_futures = [
+                search_executor.submit(self.search_videos, keyword, per_page, 'portrait')
+                for keyword in keywords
+            ]
+            
+            # Walk searches in keyword order so clip order is deterministic; a video found by
+            # several keywords is downloaded once (it would map to the same buffer clip anyway)
+            download_futures = []
+            seen_urls = set()
+            for search_future in search_futures:
+                for video in search_future.result():
+                    if len(download_futures) >= clips_count:
+                        break
+                    if video['url'] in seen_urls:
+                        continue
+                    seen_urls.add(video['url'])
+                    download_futures.append(
+                        download_executor.submit(self.download_media, video['url'], 'video', session_id)
+                    )
+                if len(download_futures) >= clips_count:
+                    break
+            
+            clip_ids = [future.result() for future in download_futures]
+        
+        return [clip_id for clip_id in clip_ids if clip_id]
+    
     def extract_search_keywords(self, headline: str, commentary: str) -> List[str]:
         """
         Use Groq AI to extract meaningful, contextual search terms from news article
@@ -271,10 +509,13 @@ class PexelsMediaFetcher:
         Returns:
             List of specific search terms optimized for finding relevant stock footage
         """
+        cache_key = hashlib.blake2b(f"{headline}||{commentary}".encode(), digest_size=16).hexdigest()
+        cached = _keyword_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"⚡ AI search terms cache HIT: {', '.join(cached)}")
+            return cached
+        
         try:
-            # Initialize Groq client
-            client = Groq(api_key=GROQ_API_KEY)
-            
             # Create prompt for extracting visual search terms
             prompt = f"""You are a video editor searching for stock footage for a NEWS VIDEO REEL.
 
@@ -308,7 +549,7 @@ RESPOND WITH ONLY THE KEYWORDS - NO EXPLANATIONS, NO INTRODUCTION TEXT.
 Format: keyword1, keyword2, keyword3, keyword4, keyword5"""
 
             # Call Groq API
-            response = client.chat.completions.create(
+            response = self.groq_client.chat.completions.create(
                 model="llama-3.1-8b-instant",
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.3,
@@ -335,6 +576,7 @@ Format: keyword1, keyword2, keyword3, keyword4, keyword5"""
             ][:5]
             
             logger.info(f"🔑 AI-extracted search terms: {', '.join(search_terms)}")
+            _keyword_cache.put(cache_key, search_terms)
             return search_terms
             
         except Exception as e:
@@ -349,30 +591,14 @@ Format: keyword1, keyword2, keyword3, keyword4, keyword5"""
         # Combine headline and commentary
         text = f"{headline} {commentary}".lower()
         
-        # Remove common words and extract meaningful keywords
-        common_words = {
-            'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-            'of', 'with', 'by', 'from', 'as', 'is', 'was', 'are', 'were', 'been',
-            'be', 'have', 'has', 'had', 'do', 'does', 'did', 'will', 'would',
-            'could', 'should', 'may', 'might', 'can', 'this', 'that', 'these',
-            'those', 'it', 'its', "it's", 'what', 'which', 'who', 'when', 'where',
-            'why', 'how', 'about', 'into', 'through', 'during', 'before', 'after',
-            'above', 'below', 'between', 'under', 'again', 'further', 'then', 'once'
-        }
-        
         # Split into words
-        words = text.replace(',', ' ').replace('.', ' ').replace('!', ' ').replace('?', ' ').split()
+        words = _KEYWORD_SPLIT_RE.split(text)
         
         # Filter out common words and short words
-        keywords = [w for w in words if w not in common_words and len(w) > 3]
-        
-        # Take top keywords (unique)
-        unique_keywords = []
-        for keyword in keywords:
-            if keyword not in unique_keywords:
-                unique_keywords.append(keyword)
-            if len(unique_keywords) >= 5:  # Limit to top 5 keywords
-                break
+        keywords = [w for w in words if w not in _COMMON_WORDS and len(w) > 3]
+        
+        # Take top 5 keywords (unique, first-seen order)
+        unique_keywords = list(dict.fromkeys(keywords))[:5]
         
         # Fallback: use headline words if no good keywords found
         if not unique_keywords:
@@ -19,7 +19,7 @@ print("=" * 60)
 print("\n1️⃣ Testing CockroachDB Buffer Storage...")
 try:
     from cockroach_buffer import CockroachBufferStorage
-    buffer = CockroachBufferStorage()
+    buffer = CockroachBufferStorage.get_default()
     stats = buffer.get_buffer_stats()
     print(f"✅ Buffer connected: {stats['total_clips']} clips, {stats['total_mb']:.2f} MB")
 except Exception as e:
@@ -41,12 +41,12 @@ def test_buffer_storage():
         logger.info("🧪 Testing CockroachDB Buffer Storage System...")
         
         # Initialize buffer
-        buffer = CockroachBufferStorage()
+        buffer = CockroachBufferStorage.get_default()
         logger.info("✅ Buffer storage initialized")
         
-        # Get buffer stats
-        stats = buffer.get_buffer_stats()
-        logger.info(f"📊 Current buffer: {stats['total_clips']} clips, {stats['total_mb']:.2f} MB")
+        # Get buffer stats (baseline for the final check; one round-trip instead of one per step)
+        initial_stats = buffer.get_buffer_stats()
+        logger.info(f"📊 Current buffer: {initial_stats['total_clips']} clips, {initial_stats['total_mb']:.2f} MB")
         
         # Initialize Pexels fetcher
         pexels = PexelsMediaFetcher()
@@ -87,19 +87,17 @@ def test_buffer_storage():
                 else:
                     logger.error("❌ Failed to retrieve clip from buffer")
                 
-                # Test 4: Buffer stats
-                logger.info("\n📊 Test 4: Buffer statistics...")
-                stats = buffer.get_buffer_stats()
-                logger.info(f"Buffer: {stats['total_clips']} clips, {stats['total_mb']:.2f} MB")
-                
-                # Test 5: Delete clip
-                logger.info("\n🗑️ Test 5: Deleting clip from buffer...")
+                # Test 4: Delete clip
+                logger.info("\n🗑️ Test 4: Deleting clip from buffer...")
                 buffer.delete_clip(clip_id)
                 logger.info("✅ Clip deleted")
                 
-                # Final stats
+                # Test 5: Buffer stats should be back to the baseline
+                logger.info("\n📊 Test 5: Buffer statistics...")
                 stats = buffer.get_buffer_stats()
                 logger.info(f"Final buffer: {stats['total_clips']} clips, {stats['total_mb']:.2f} MB")
+                if stats['total_clips'] != initial_stats['total_clips']:
+                    logger.warning(f"⚠️ Buffer changed by {stats['total_clips'] - initial_stats['total_clips']} clips during test")
                 
             else:
                 logger.error("❌ Failed to download video to buffer")
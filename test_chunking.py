@@ -4,6 +4,9 @@ Quick test for chunked buffer storage
 
 import os
 import sys
+import time
+import random
+import hashlib
 import tempfile
 
 # Add parent directory to path to import from backinsta
@@ -16,27 +19,45 @@ load_dotenv(env_path)
 
 from cockroach_buffer import CockroachBufferStorage
 
+def _create_test_file(size: int, seed: int) -> str:
+    """
+    Create a size-byte .mp4 test file of seeded pseudorandom data, written in 64 KiB blocks
+    (no full-size buffer in memory). Random content doesn't compress or dedupe to nothing,
+    so the clip really goes through the chunked path; the seed keeps runs reproducible.
+    """
+    rng = random.Random(seed)
+    fd, path = tempfile.mkstemp(suffix='.mp4')
+    try:
+        if hasattr(os, 'posix_fallocate'):
+            os.posix_fallocate(fd, 0, size)
+        for offset in range(0, size, 65536):
+            os.pwrite(fd, rng.randbytes(min(65536, size - offset)), offset)
+    finally:
+        os.close(fd)
+    return path
+
 def test_chunking():
     """Test chunked storage with a large dummy file"""
     
     print("\n🧪 Testing CockroachDB Chunked Storage...")
     
     # Initialize buffer
-    buffer = CockroachBufferStorage()
+    buffer = CockroachBufferStorage.get_default()
     
     # Create a large dummy file (12 MB - should trigger chunking)
     print("\n📝 Creating 12 MB test file...")
-    large_data = b'X' * (12 * 1024 * 1024)  # 12 MB of 'X' bytes
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as f:
-        f.write(large_data)
-        temp_path = f.name
+    large_size = 12 * 1024 * 1024  # 12 MB of pseudorandom bytes
+    temp_path = _create_test_file(large_size, seed=0)
     
     file_size = os.path.getsize(temp_path) / (1024 * 1024)
     print(f"✅ Created test file: {file_size:.2f} MB")
     
+    # Digest before storing - store_clip deletes the local file once it's uploaded
+    with open(temp_path, 'rb') as f:
+        expected_digest = hashlib.file_digest(f, 'sha256').digest()
+    
     # Test storing (should chunk)
-    print("\n💾 Storing large file (should chunk into 8 MB pieces)...")
+    print(f"\n💾 Storing large file (should chunk into {buffer.chunk_size / (1024 * 1024):g} MB pieces)...")
     session_id = "test_chunk_session"
     clip_id = buffer.store_clip(temp_path, 'video', session_id)
     
@@ -58,13 +79,14 @@ def test_chunking():
     retrieved_size = os.path.getsize(retrieved_path) / (1024 * 1024)
     print(f"✅ Retrieved clip: {retrieved_size:.2f} MB")
     
+    # Compare SHA-256 digests (streamed from disk) rather than the full contents in memory
     with open(retrieved_path, 'rb') as f:
-        retrieved_data = f.read()
+        retrieved_digest = hashlib.file_digest(f, 'sha256').digest()
     
-    if retrieved_data == large_data:
+    if retrieved_digest == expected_digest:
         print("✅ Data integrity verified - chunks reassembled correctly!")
     else:
-        print(f"❌ Data mismatch! Original: {len(large_data)} bytes, Retrieved: {len(retrieved_data)} bytes")
+        print(f"❌ Data mismatch! Original: {large_size} bytes, Retrieved: {os.path.getsize(retrieved_path)} bytes")
         return False
     
     # Cleanup
@@ -77,11 +99,7 @@ def test_chunking():
     
     # Test small file (should NOT chunk)
     print("\n📝 Testing small file (3 MB - should NOT chunk)...")
-    small_data = b'Y' * (3 * 1024 * 1024)
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as f:
-        f.write(small_data)
-        small_path = f.name
+    small_path = _create_test_file(3 * 1024 * 1024, seed=1)
     
     clip_id2 = buffer.store_clip(small_path, 'video', session_id)
     
@@ -99,7 +117,53 @@ def test_chunking():
     print("\n✅ All chunking tests passed!")
     return True
 
+def benchmark_chunk_sizes(chunk_sizes_mb=(1, 2, 4, 6, 8, 12)):
+    """Store/retrieve the 12 MB test clip once per chunk size and print the timings"""
+    
+    print("\n⏱️ Benchmarking chunk sizes (12 MB clip)...")
+    
+    # Measure the chunked CockroachDB path only
+    os.environ.pop('BUFFER_GCS_BUCKET', None)
+    
+    buffer = CockroachBufferStorage.get_default()
+    default_chunk_size = buffer.chunk_size
+    session_id = "test_chunk_benchmark"
+    
+    temp_path = _create_test_file(12 * 1024 * 1024, seed=0)
+    with open(temp_path, 'rb') as f:
+        data = f.read()
+    os.unlink(temp_path)
+    
+    print(f"\n{'chunk MB':>9} {'chunks':>7} {'store s':>8} {'retrieve s':>11}")
+    try:
+        for chunk_size_mb in chunk_sizes_mb:
+            buffer.chunk_size = chunk_size_mb * 1024 * 1024
+            
+            start = time.perf_counter()
+            clip_id = buffer.store_clip_bytes(data, 'video', session_id)
+            store_seconds = time.perf_counter() - start
+            if not clip_id:
+                print(f"{chunk_size_mb:>9} ❌ store failed")
+                continue
+            
+            start = time.perf_counter()
+            retrieved_path = buffer.retrieve_clip(clip_id)
+            retrieve_seconds = time.perf_counter() - start
+            if retrieved_path:
+                os.unlink(retrieved_path)
+            
+            chunks = -(-len(data) // buffer.chunk_size)
+            print(f"{chunk_size_mb:>9} {chunks:>7} {store_seconds:>8.2f} {retrieve_seconds:>11.2f}")
+            buffer.delete_clip(clip_id)
+    finally:
+        buffer.chunk_size = default_chunk_size
+        buffer.delete_session_clips(session_id)
+
 if __name__ == "__main__":
+    if '--chunk-matrix' in sys.argv:
+        benchmark_chunk_sizes()
+        sys.exit(0)
+    
     try:
         success = test_chunking()
         if success:
@@ -5,6 +5,7 @@ Tests the full pipeline: fetch articles, create reel with buffer
 import os
 import sys
 import logging
+import subprocess
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -25,7 +26,7 @@ def test_full_reel_creation():
     """Test creating a complete animated reel with buffer storage"""
     try:
         from animated_reel_creator import AnimatedReelCreator
-        from google_tts_voice import GoogleTTSVoice
+        from google_tts_voice import GoogleTTSVoice, TTS_CACHE_DIR
         
         logger.info("🎬 Testing Full Animated Reel Creation with Buffer Storage")
         logger.info("=" * 60)
@@ -43,7 +44,7 @@ def test_full_reel_creation():
         
         # Step 1: Generate voice narration
         logger.info("\n🎤 Step 1: Generating voice narration...")
-        tts = GoogleTTSVoice()
+        tts = GoogleTTSVoice(cache_dir=TTS_CACHE_DIR)
         
         # Create temp file for voice
         import tempfile
@@ -98,7 +99,12 @@ def test_full_reel_creation():
         
         # Open the video
         logger.info("\n🎥 Opening video for review...")
-        os.system(f'open "{video_path}"')
+        # Launch the viewer without a shell and without waiting on it
+        try:
+            subprocess.Popen(['open' if sys.platform == 'darwin' else 'xdg-open', video_path],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not open video: {e}")
         
         # Clean up voice file
         try:
@@ -12,6 +12,10 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 env_path = os.path.join(parent_dir, '.env')
 load_dotenv(env_path)
 
+# Optional: cache NYT/Pexels API GETs between local runs (see integration_http_cache)
+from integration_http_cache import install_api_cache
+install_api_cache()
+
 print("=" * 80)
 print("🎬 TESTING REEL GENERATION FLOW (DRY RUN)")
 print("=" * 80)
@@ -22,7 +22,7 @@ with open(test_file, 'wb') as f:
 print(f"✅ Created test file: {test_file}")
 
 # Test buffer
-buffer = CockroachBufferStorage()
+buffer = CockroachBufferStorage.get_default()
 print("✅ Connected to buffer")
 
 # Store
@@ -35,10 +35,8 @@ retrieved_path = buffer.retrieve_clip(clip_id)
 if retrieved_path:
     print(f"✅ Retrieved clip to: {retrieved_path}")
     
-    # Check content
-    with open(retrieved_path, 'rb') as f:
-        data = f.read()
-    print(f"✅ Data size: {len(data)} bytes")
+    # Check size (stat only - no need to read the clip back into memory)
+    print(f"✅ Data size: {os.path.getsize(retrieved_path)} bytes")
     
     # Cleanup
     os.unlink(retrieved_path)
@@ -6,6 +6,8 @@ Test single reel generation with Cloud Run hybrid architecture
 import os
 import sys
 import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 # Load environment from parent QPost directory
@@ -13,6 +15,10 @@ parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 env_path = os.path.join(parent_dir, '.env')
 load_dotenv(env_path)
 
+# Optional: cache NYT/Pexels API GETs between local runs (see integration_http_cache)
+from integration_http_cache import install_api_cache
+install_api_cache()
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,7 +29,7 @@ logger = logging.getLogger(__name__)
 # Import required modules
 import requests
 from lightweight_reel_creator import LightweightReelCreator
-from google_tts_voice import GoogleTTSVoice
+from google_tts_voice import GoogleTTSVoice, TTS_CACHE_DIR
 from pexels_video_fetcher import PexelsMediaFetcher
 
 print("=" * 80)
@@ -31,6 +37,12 @@ print("🎬 TESTING SINGLE REEL GENERATION")
 print("=" * 80)
 print()
 
+# Only the voice needs the article text: build the TTS/Pexels clients while NYT is
+# fetched, then generate the voice in the background while Pexels is searched
+setup_pool = ThreadPoolExecutor(max_workers=2)
+tts_future = setup_pool.submit(GoogleTTSVoice, cache_dir=TTS_CACHE_DIR)
+fetcher_future = setup_pool.submit(PexelsMediaFetcher)
+
 # Step 1: Fetch NYT article
 print("📰 Step 1: Fetching NYT article...")
 try:
@@ -76,17 +88,15 @@ except Exception as e:
 
 print()
 
-# Step 2: Generate voice
-print("🗣️  Step 2: Generating voice narration...")
-try:
-    import tempfile
-    tts = GoogleTTSVoice()
-    
-    # Create temp file for voice
-    voice_fd, voice_path = tempfile.mkstemp(suffix='.mp3', prefix='test_voice_')
-    os.close(voice_fd)
-    
-    tts.generate_voice(
+# Step 2: Generate voice (in the background, overlapping Step 3)
+print("🗣️  Step 2: Generating voice narration (in background)...")
+
+# Create temp file for voice
+voice_fd, voice_path = tempfile.mkstemp(suffix='.mp3', prefix='test_voice_')
+os.close(voice_fd)
+
+def generate_voice():
+    tts_future.result().generate_voice(
         text=f"{headline}. {abstract}",
         output_path=voice_path,
         voice_name="en-US-Studio-O"  # Female voice
@@ -94,19 +104,16 @@ try:
     
     if not os.path.exists(voice_path) or os.path.getsize(voice_path) == 0:
         raise Exception("Voice generation failed - empty file")
-    
-    print(f"✅ Voice generated: {voice_path}")
-    
-except Exception as e:
-    logger.error(f"❌ Voice generation failed: {e}")
-    sys.exit(1)
+
+voice_future = setup_pool.submit(generate_voice)
+setup_pool.shutdown(wait=False)
 
 print()
 
 # Step 3: Search for video clips
 print("🎥 Step 3: Searching for video clips on Pexels...")
 try:
-    fetcher = PexelsMediaFetcher()
+    fetcher = fetcher_future.result()
     
     # Extract keywords from headline
     keywords = fetcher.extract_search_keywords(headline, abstract)
@@ -147,6 +154,18 @@ except Exception as e:
     logger.error(f"❌ Clip search failed: {e}")
     import traceback
     traceback.print_exc()
+    voice_future.exception()  # Let the voice finish writing before removing it
+    os.unlink(voice_path) if os.path.exists(voice_path) else None
+    sys.exit(1)
+
+print()
+
+# Wait for Step 2
+try:
+    voice_future.result()
+    print(f"✅ Voice generated: {voice_path}")
+except Exception as e:
+    logger.error(f"❌ Voice generation failed: {e}")
     os.unlink(voice_path) if os.path.exists(voice_path) else None
     sys.exit(1)
 